@@ -0,0 +1,106 @@
+import copy
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.fields.files import FieldFile
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from constants import TOKEN_CACHE_TTL, TOKEN_LOCAL_CACHE_SIZE, TOKEN_LOCAL_CACHE_TTL
+from recipes.shortlinks import LRUCache
+
+
+User = get_user_model()
+
+TOKEN_CACHE_DEFERRED_FIELDS = ('password', 'recipes_count', 'subscribers_count')
+
+token_cache = LRUCache(TOKEN_LOCAL_CACHE_SIZE, TOKEN_LOCAL_CACHE_TTL)
+
+
+def get_token_cache_key(key):
+    return f'auth_token:{key}'
+
+
+def get_token_version_key(key):
+    return f'auth_token_version:{key}'
+
+
+def is_token_cache_enabled():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_cached_fields():
+    return [
+        field
+        for field in User._meta.concrete_fields
+        if field.attname not in TOKEN_CACHE_DEFERRED_FIELDS
+    ]
+
+
+def dump_user(user, fields):
+    values = []
+    for field in fields:
+        value = field.value_from_object(user)
+        values.append(value.name if isinstance(value, FieldFile) else value)
+    return values
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+    cache.set(get_token_version_key(key), uuid.uuid4().hex, TOKEN_CACHE_TTL)
+    cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        return
+    invalidate_token(token.key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def get_cached_values(self, key, version):
+        entry = token_cache.get(key)
+        if entry is None:
+            entry = cache.get(get_token_cache_key(key))
+            if entry is None:
+                return None
+            token_cache.set(key, entry)
+        if entry[0] != version:
+            token_cache.delete(key)
+            return None
+        return copy.deepcopy(entry[1])
+
+    def authenticate_credentials(self, key):
+        if not is_token_cache_enabled():
+            return super().authenticate_credentials(key)
+        version_key = get_token_version_key(key)
+        version = cache.get(version_key)
+        fields = get_cached_fields()
+        if version is not None:
+            values = self.get_cached_values(key, version)
+            if values is not None:
+                user = User.from_db(
+                    DEFAULT_DB_ALIAS, [field.attname for field in fields], values
+                )
+                if not user.is_active:
+                    raise exceptions.AuthenticationFailed(
+                        _('User inactive or deleted.')
+                    )
+                return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(version_key, version, TOKEN_CACHE_TTL):
+                return user, token
+        entry = (version, dump_user(user, fields))
+        token_cache.set(key, entry)
+        cache.set(get_token_cache_key(key), entry, TOKEN_CACHE_TTL)
+        return user, token
@@ -0,0 +1,112 @@
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+    quote_etag,
+)
+from django.utils.http import http_date
+
+from recipes.utils import (
+    RECIPE_LIST_VERSION_KEY,
+    RECIPE_POPULARITY_VERSION_KEY,
+    get_cache_versions,
+    get_user_cache_version_key,
+)
+
+
+RECIPE_LIST_USER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+EMPTY_RECIPE_OVERLAY = {
+    'favorited': set(),
+    'in_shopping_cart': set(),
+    'subscribed': set(),
+}
+
+
+def make_etag(*parts):
+    payload = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(payload.encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def get_not_modified_response(request, etag, last_modified=None):
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp()),
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def patch_user_cache_control(request, response):
+    patch_vary_headers(response, ('Authorization',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def get_recipe_list_cache_keys(request):
+    user = request.user
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    version_keys = [RECIPE_LIST_VERSION_KEY]
+    if request.query_params.get('ordering') == 'popular':
+        version_keys.append(RECIPE_POPULARITY_VERSION_KEY)
+    if user.is_authenticated:
+        version_keys.append(get_user_cache_version_key(user.pk))
+    versions = get_cache_versions(*version_keys)
+    page_versions = versions
+    is_user_page = any(
+        name in request.query_params for name in RECIPE_LIST_USER_FILTERS
+    )
+    if user.is_authenticated and not is_user_page:
+        page_versions = versions[:-1]
+    page_key = 'recipe_list:' + make_etag(
+        request.get_host(),
+        params,
+        page_versions,
+        user.pk if is_user_page else None,
+    ).strip('"')
+    if not user.is_authenticated:
+        return page_key, None
+    overlay_key = f'recipe_list_overlay:{user.pk}:{versions[-1]}:{page_key}'
+    return page_key, overlay_key
+
+
+def extract_recipe_overlay(data):
+    recipes = data['results']
+    return {
+        'favorited': {recipe['id'] for recipe in recipes if recipe['is_favorited']},
+        'in_shopping_cart': {
+            recipe['id'] for recipe in recipes if recipe['is_in_shopping_cart']
+        },
+        'subscribed': {
+            recipe['author']['id']
+            for recipe in recipes
+            if recipe['author']['is_subscribed']
+        },
+    }
+
+
+def apply_recipe_overlay(data, overlay):
+    for recipe in data['results']:
+        recipe['is_favorited'] = recipe['id'] in overlay['favorited']
+        recipe['is_in_shopping_cart'] = recipe['id'] in overlay['in_shopping_cart']
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in overlay['subscribed']
+        )
+    return data
@@ -0,0 +1,17 @@
+from django.core.checks import Warning, register
+
+from api.authentication import is_token_cache_enabled
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_token_cache_enabled():
+        return []
+    return [
+        Warning(
+            'Кеш по умолчанию не общий для процессов: кеш токенов отключён, '
+            'а сброс версий кешей не дойдёт до остальных процессов.',
+            hint='Укажите общий бэкенд в CACHE_BACKEND, например FileBasedCache.',
+            id='api.W001',
+        )
+    ]
@@ -1,16 +1,148 @@
 import base64
-import uuid
+import binascii
+import hashlib
+import io
+import posixpath
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from PIL import Image
 from rest_framework import serializers
 
+from constants import BASE64_CHUNK_SIZE, MAX_IMAGE_PIXELS, MAX_IMAGE_SIZE
+
+
+BASE64_SEPARATOR = ';base64,'
+BASE64_WHITESPACE = ' \t\n\r\x0b\x0c'
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в base64',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт',
+        'too_many_pixels': 'Изображение не должно быть больше {max_pixels} пикселей',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, image = data.split(';base64,')
-            ext = format.split('/')[-1]
-            id = str(uuid.uuid4())
-            filename = f'{id}.{ext}'
-            data = ContentFile(base64.b64decode(image), name=filename)
+            current_image = self.get_unchanged_image(data)
+            if current_image is not None:
+                return current_image
+            data = self.decode_base64(data)
+        elif getattr(data, 'size', 0) > MAX_IMAGE_SIZE:
+            self.fail('too_large', max_size=MAX_IMAGE_SIZE)
+        if hasattr(data, 'seek'):
+            self.check_dimensions(data)
         return super().to_internal_value(data)
+
+    def split_payload(self, data):
+        index = data.find(BASE64_SEPARATOR)
+        if index == -1:
+            self.fail('invalid_base64')
+        return data[:index], index + len(BASE64_SEPARATOR)
+
+    def get_decoded_size(self, data, start):
+        end = len(data)
+        while end > start and data[end - 1].isspace():
+            end -= 1
+        whitespace = sum(data.count(char, start, end) for char in BASE64_WHITESPACE)
+        padding = data.count('=', max(start, end - 2), end)
+        return (end - start - whitespace) * 3 // 4 - padding
+
+    def decode_chunks(self, data, start):
+        remainder = ''
+        for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+            window = remainder + ''.join(
+                data[offset : offset + BASE64_CHUNK_SIZE].split()
+            )
+            aligned = len(window) - len(window) % 4
+            remainder = window[aligned:]
+            try:
+                yield base64.b64decode(window[:aligned])
+            except binascii.Error:
+                self.fail('invalid_base64')
+        if remainder:
+            self.fail('invalid_base64')
+
+    def get_unchanged_image(self, data):
+        instance = getattr(self.parent, 'instance', None)
+        current_image = getattr(instance, self.source, None)
+        if not current_image:
+            return None
+        _, start = self.split_payload(data)
+        try:
+            if self.get_decoded_size(data, start) != current_image.size:
+                return None
+        except OSError:
+            return None
+        digest = hashlib.sha256()
+        for chunk in self.decode_chunks(data, start):
+            digest.update(chunk)
+        stem = posixpath.splitext(posixpath.basename(current_image.name))[0]
+        if stem != digest.hexdigest():
+            return None
+        return current_image
+
+    def decode_base64(self, data):
+        header, start = self.split_payload(data)
+        ext = header.split('/')[-1]
+        size = self.get_decoded_size(data, start)
+        if size > MAX_IMAGE_SIZE:
+            self.fail('too_large', max_size=MAX_IMAGE_SIZE)
+        filename = f'image.{ext}'
+        content_type = f'image/{ext}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            image = TemporaryUploadedFile(filename, content_type, size, None)
+        else:
+            image = InMemoryUploadedFile(
+                io.BytesIO(), None, filename, content_type, size, None
+            )
+        for chunk in self.decode_chunks(data, start):
+            first_chunk = not image.tell()
+            image.write(chunk)
+            if first_chunk:
+                self.check_dimensions(image)
+        if not image.tell():
+            self.fail('invalid_base64')
+        image.size = image.tell()
+        image.seek(0)
+        return image
+
+    def check_dimensions(self, image):
+        position = image.tell()
+        image.seek(0)
+        try:
+            with Image.open(image) as header:
+                width, height = header.size
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=MAX_IMAGE_PIXELS)
+        except (OSError, SyntaxError):
+            return
+        finally:
+            image.seek(position)
+        if width * height > MAX_IMAGE_PIXELS:
+            self.fail('too_many_pixels', max_pixels=MAX_IMAGE_PIXELS)
+
+
+class PrimaryKeyValueField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        build_url = request.build_absolute_uri if request else str
+        return {
+            name: {
+                extension: build_url(default_storage.url(path))
+                for extension, path in formats.items()
+            }
+            for name, formats in value.get('variants', {}).items()
+        }
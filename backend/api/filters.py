@@ -1,11 +1,46 @@
 from django_filters import rest_framework as filters
 from rest_framework import filters as drf_filters
 
-from recipes.models import Recipe
+from recipes.matching import INGREDIENT_MATCH_MODES, match_recipes
+from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
 
 
-class NameSearchFilter(drf_filters.SearchFilter):
-    search_param = 'name'
+class IngredientFilter(filters.FilterSet):
+    name = filters.CharFilter(method='filter_name')
+
+    class Meta:
+        model = Ingredient
+        fields = ('name',)
+
+    def filter_name(self, queryset, name, value):
+        return queryset.filter(name__istartswith=value)
+
+
+class RecipeOrderingFilter(drf_filters.OrderingFilter):
+    orderings = {
+        'popular': ('-favorites_count', '-id'),
+        'cooking_time': ('cooking_time', '-id'),
+        '-cooking_time': ('-cooking_time', 'id'),
+    }
+    rank_fields = ('ingredient_coverage', 'search_rank')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_param)
+        if ordering in self.orderings:
+            return self.orderings[ordering]
+        ranking = tuple(
+            f'-{field}'
+            for field in self.rank_fields
+            if field in queryset.query.annotations
+        )
+        if ranking:
+            return (*ranking, '-id')
+        return self.get_default_ordering(view)
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class RecipeFilter(filters.FilterSet):
@@ -15,6 +50,12 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_shopping_carts',
     )
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    match = filters.ChoiceFilter(
+        choices=[(mode, mode) for mode in INGREDIENT_MATCH_MODES],
+        method='filter_match',
+    )
 
     class Meta:
         model = Recipe
@@ -35,3 +76,17 @@ class RecipeFilter(filters.FilterSet):
                 return queryset.filter(shopping_carts__user=user)
             return queryset.exclude(shopping_carts__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        ingredient_ids = list(dict.fromkeys(int(pk) for pk in value))
+        if not ingredient_ids:
+            return queryset
+        return match_recipes(
+            queryset, ingredient_ids, self.form.cleaned_data.get('match') or 'all'
+        )
+
+    def filter_match(self, queryset, name, value):
+        return queryset
@@ -0,0 +1,229 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.management.utils import get_api_clients, get_api_host, get_benchmark_user
+from api.serializers.recipes import (
+    IngredientSerializer,
+    RecipeIngredientReadSerializer,
+    RecipeReadSerializer,
+    SimpleRecipeSerializer,
+)
+from api.serializers.subscriptions import SubscriptionSerializer
+from api.serializers.users import CustomUserSerializer
+from api.views.recipes import RecipeViewSet
+from api.views.users import CustomUserViewSet
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+PERCENTILES = (50, 90, 95, 99)
+SERIALIZER_REPEATS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки и число SQL-запросов основных эндпоинтов API '
+        'и сохраняет результаты в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--user', type=int, help='id пользователя для авторизованных запросов'
+        )
+        parser.add_argument(
+            '--clear-cache',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument('--output', type=Path)
+        parser.add_argument(
+            '--compare', type=Path, help='Файл с результатами предыдущего запуска'
+        )
+        parser.add_argument('--seed', type=int)
+        parser.add_argument(
+            '--serializers',
+            action='store_true',
+            help='Дополнительно замерить скорость сериализаторов',
+        )
+        parser.add_argument('--rows', type=int, default=500)
+
+    def get_endpoints(self, rng):
+        pages = max(Recipe.objects.count() // 6, 1)
+        prefixes = [
+            name[:2] for name in Ingredient.objects.values_list('name', flat=True)
+        ] or ['а']
+        return {
+            'recipes_list': lambda: (
+                False,
+                '/api/recipes/',
+                {'page': rng.randint(1, min(pages, 50))},
+            ),
+            'recipes_list_auth': lambda: (
+                True,
+                '/api/recipes/',
+                {'page': rng.randint(1, min(pages, 50))},
+            ),
+            'subscriptions': lambda: (
+                True,
+                '/api/users/subscriptions/',
+                {'recipes_limit': 3},
+            ),
+            'download_shopping_cart': lambda: (
+                True,
+                '/api/recipes/download_shopping_cart/',
+                {},
+            ),
+            'ingredients_search': lambda: (
+                False,
+                '/api/ingredients/',
+                {'name': rng.choice(prefixes)},
+            ),
+        }
+
+    def measure(self, client, path, params, clear_cache):
+        if clear_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path, params)
+            if response.streaming:
+                bytes_read = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                bytes_read = len(response.content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed * 1000, len(queries), bytes_read
+
+    def summarize(self, timings, query_counts, sizes, statuses):
+        cut_points = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'requests': len(timings),
+            'statuses': statuses,
+            'mean_ms': round(statistics.fmean(timings), 3),
+            **{
+                f'p{percentile}_ms': round(cut_points[percentile - 1], 3)
+                for percentile in PERCENTILES
+            },
+            'max_ms': round(max(timings), 3),
+            'mean_bytes': round(statistics.fmean(sizes)),
+            'queries': {
+                'min': min(query_counts),
+                'max': max(query_counts),
+                'mean': round(statistics.fmean(query_counts), 2),
+            },
+        }
+
+    def compare(self, results, baseline):
+        for name, current in results['endpoints'].items():
+            previous = baseline['endpoints'].get(name)
+            if previous is None:
+                continue
+            changes = ', '.join(
+                f'{key} {previous[key]} -> {current[key]}'
+                for key in ('p50_ms', 'p95_ms')
+            )
+            queries = f'{previous["queries"]["max"]} -> {current["queries"]["max"]}'
+            style = (
+                self.style.ERROR
+                if current['queries']['max'] > previous['queries']['max']
+                else self.style.NOTICE
+            )
+            self.stdout.write(style(f'{name}: {changes}, запросов {queries}'))
+
+    def get_view(self, viewset, action, request):
+        view = viewset(action=action, request=request, format_kwarg=None, kwargs={})
+        view.headers = {}
+        return view
+
+    def get_serializer_benchmarks(self, user):
+        request = Request(
+            APIRequestFactory(HTTP_HOST=get_api_host()).get('/', {'recipes_limit': 3})
+        )
+        request.user = user
+        recipes = self.get_view(RecipeViewSet, 'list', request)
+        users = self.get_view(CustomUserViewSet, 'retrieve', request)
+        subscriptions = self.get_view(CustomUserViewSet, 'subscriptions', request)
+        return request, {
+            IngredientSerializer: Ingredient.objects.all(),
+            SimpleRecipeSerializer: Recipe.objects.all(),
+            RecipeIngredientReadSerializer: RecipeIngredient.objects.select_related(
+                'ingredient'
+            ),
+            RecipeReadSerializer: recipes.get_queryset(),
+            CustomUserSerializer: users.get_queryset(),
+            SubscriptionSerializer: subscriptions.get_subscriptions_queryset(),
+        }
+
+    def benchmark_serializers(self, user, rows):
+        request, benchmarks = self.get_serializer_benchmarks(user)
+        for serializer_class, queryset in benchmarks.items():
+            best = None
+            for _ in range(SERIALIZER_REPEATS):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    data = serializer_class(
+                        queryset.order_by('-pk')[:rows],
+                        many=True,
+                        context={'request': request},
+                    ).data
+                    elapsed = time.perf_counter() - started
+                if best is None or elapsed < best:
+                    best = elapsed
+            self.stdout.write(
+                f'{serializer_class.__name__}: {len(data) / best:.0f} строк/с '
+                f'({len(data)} строк, запросов {len(queries)})'
+            )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Нужно хотя бы 2 запроса на эндпоинт')
+        rng = random.Random(options['seed'])
+        user = get_benchmark_user(options['user'])
+        clients = get_api_clients(user)
+        results = {
+            'started': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.pk,
+            'clear_cache': options['clear_cache'],
+            'endpoints': {},
+        }
+        for name, make_request in self.get_endpoints(rng).items():
+            timings, query_counts, sizes, statuses = [], [], [], {}
+            for number in range(options['warmup'] + options['requests']):
+                authenticated, path, params = make_request()
+                status, elapsed, query_count, bytes_read = self.measure(
+                    clients[authenticated], path, params, options['clear_cache']
+                )
+                if number < options['warmup']:
+                    continue
+                timings.append(elapsed)
+                query_counts.append(query_count)
+                sizes.append(bytes_read)
+                statuses[status] = statuses.get(status, 0) + 1
+            summary = self.summarize(timings, query_counts, sizes, statuses)
+            results['endpoints'][name] = summary
+            self.stdout.write(
+                f'{name}: p50 {summary["p50_ms"]} мс, p95 {summary["p95_ms"]} мс, '
+                f'p99 {summary["p99_ms"]} мс, запросов {summary["queries"]["max"]}, '
+                f'{summary["mean_bytes"]} байт'
+            )
+        if options['serializers']:
+            self.benchmark_serializers(user, options['rows'])
+        if options['compare'] is not None:
+            self.compare(results, json.loads(options['compare'].read_text()))
+        if options['output'] is not None:
+            options['output'].write_text(json.dumps(results, indent=2))
+            self.stdout.write(
+                self.style.SUCCESS(f'Результаты сохранены в {options["output"]}')
+            )
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db.models import Count
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+User = get_user_model()
+
+
+def get_benchmark_user(user_id=None):
+    users = User.objects.all()
+    if user_id is not None:
+        users = users.filter(pk=user_id)
+    user = (
+        users.annotate(
+            subscriptions_total=Count('subscriptions', distinct=True),
+            shopping_carts_total=Count('shopping_carts', distinct=True),
+        )
+        .order_by('-subscriptions_total', '-shopping_carts_total')
+        .first()
+    )
+    if user is None:
+        raise CommandError('Нет пользователя для авторизованных запросов')
+    return user
+
+
+def get_api_host():
+    return next((host for host in settings.ALLOWED_HOSTS if host != '*'), 'testserver')
+
+
+def get_api_clients(user):
+    host = get_api_host()
+    token, _ = Token.objects.get_or_create(user=user)
+    clients = {False: APIClient(HTTP_HOST=host), True: APIClient(HTTP_HOST=host)}
+    clients[True].credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return clients
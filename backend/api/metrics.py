@@ -0,0 +1,206 @@
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import cache
+from threading import Lock
+
+from django.conf import settings
+
+from constants import (
+    METRICS_DURATION_BUCKETS,
+    METRICS_QUERY_BUCKETS,
+    METRICS_SIZE_BUCKETS,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self.series.items()
+            ]
+        for key, counts, total, count in sorted(series):
+            labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    METRICS_DURATION_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время SQL-запросов за один запрос',
+    METRICS_DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries',
+    'Число SQL-запросов за один запрос',
+    METRICS_QUERY_BUCKETS,
+)
+SERIALIZATION_DURATION = Histogram(
+    'foodgram_serialization_duration_seconds',
+    'Время сериализации и рендеринга ответа без SQL-запросов',
+    METRICS_DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    METRICS_SIZE_BUCKETS,
+)
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    DB_DURATION,
+    DB_QUERIES,
+    SERIALIZATION_DURATION,
+    RESPONSE_SIZE,
+)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    def __init__(self, request):
+        self.request = request
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.db_duration = 0.0
+        self.queries = 0
+        self.serialization = 0.0
+        self.size = 0
+
+    def get_route(self):
+        resolver_match = getattr(self.request, 'resolver_match', None)
+        if resolver_match is None:
+            return 'unmatched'
+        return resolver_match.view_name or resolver_match._func_path
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_duration += elapsed
+            self.queries += 1
+            if elapsed * 1000 >= settings.PERFORMANCE_METRICS['SLOW_QUERY_MS']:
+                resolver_match = getattr(self.request, 'resolver_match', None)
+                logger.warning(
+                    'Медленный запрос %.1f мс в %s (%s %s): %s',
+                    elapsed * 1000,
+                    resolver_match._func_path if resolver_match else 'unmatched',
+                    self.request.method,
+                    self.request.path,
+                    sql,
+                )
+
+    @contextmanager
+    def measure_serialization(self):
+        started = time.perf_counter()
+        db_duration = self.db_duration
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.serialization += elapsed - (self.db_duration - db_duration)
+
+    def start_serialization(self, response):
+        started = time.perf_counter()
+
+        def rendered(response):
+            self.serialization += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+
+    def get_server_timing(self):
+        elapsed = time.perf_counter() - self.started
+        app = max(elapsed - self.db_duration - self.serialization, 0)
+        return ', '.join(
+            (
+                f'total;dur={elapsed * 1000:.1f}',
+                f'db;dur={self.db_duration * 1000:.1f};desc="queries={self.queries}"',
+                f'serialize;dur={self.serialization * 1000:.1f}',
+                f'app;dur={app * 1000:.1f}',
+            )
+        )
+
+    def finish(self, status_code):
+        self.duration = time.perf_counter() - self.started
+        labels = {'route': self.get_route(), 'method': self.request.method}
+        REQUEST_DURATION.observe({**labels, 'status': status_code}, self.duration)
+        DB_DURATION.observe(labels, self.db_duration)
+        DB_QUERIES.observe(labels, self.queries)
+        SERIALIZATION_DURATION.observe(labels, self.serialization)
+        RESPONSE_SIZE.observe(labels, self.size)
+
+
+class MeasuredSerializerMixin:
+    @property
+    def data(self):
+        metrics = getattr(self.context.get('request'), 'performance_metrics', None)
+        if metrics is None:
+            return super().data
+        with metrics.measure_serialization():
+            return super().data
+
+
+@cache
+def get_measured_serializer_class(serializer_class):
+    return type(
+        serializer_class.__name__, (MeasuredSerializerMixin, serializer_class), {}
+    )
+
+
+class SerializationMetricsMixin:
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if hasattr(self.request, 'performance_metrics'):
+            serializer.__class__ = get_measured_serializer_class(type(serializer))
+        return serializer
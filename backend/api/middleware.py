@@ -0,0 +1,46 @@
+from contextlib import ExitStack
+
+from django.db import connection
+
+from api.metrics import RequestMetrics
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request.performance_metrics = RequestMetrics(request)
+        stack = ExitStack()
+        stack.enter_context(connection.execute_wrapper(metrics.execute))
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.count_streamed(
+                response.streaming_content, stack, metrics, response.status_code
+            )
+        else:
+            stack.close()
+            if not response.streaming:
+                metrics.size = len(response.content)
+            metrics.finish(response.status_code)
+        response['Server-Timing'] = metrics.get_server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, 'performance_metrics', None)
+        if metrics is not None:
+            metrics.start_serialization(response)
+        return response
+
+    def count_streamed(self, content, stack, metrics, status_code):
+        try:
+            for chunk in content:
+                metrics.size += len(chunk)
+                yield chunk
+        finally:
+            stack.close()
+            metrics.finish(status_code)
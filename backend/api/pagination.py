@@ -1,4 +1,5 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from constants import DEFAULT_PAGE_SIZE
 
@@ -6,3 +7,38 @@ from constants import DEFAULT_PAGE_SIZE
 class DefaultPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+class IdCursorPagination(CursorPagination):
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        return (self.ordering,)
+
+
+class CursorSwitchPagination(DefaultPagination):
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode:
+            if tuple(queryset.query.order_by) != (IdCursorPagination.ordering,):
+                raise ValidationError(
+                    {
+                        self.mode_query_param: (
+                            'Курсорная пагинация доступна только '
+                            'при сортировке по новизне'
+                        )
+                    }
+                )
+            self.cursor_pagination = IdCursorPagination()
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+        self.cursor_pagination = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,8 +1,15 @@
+import json
+from functools import partial
+
+from django.db import transaction
+from django.http import QueryDict
 from rest_framework import serializers
 
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageVariantsField, PrimaryKeyValueField
 from api.serializers.users import CustomUserSerializer
+from constants import MAX_BULK_RECIPES
+from recipes.matching import record_recipe_ingredient_changes
 from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
 
 
@@ -34,6 +41,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         fields = (
@@ -42,6 +50,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'ingredients',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
             'is_favorited',
@@ -49,21 +58,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
         model = Recipe
 
-    def is_user_relation(self, manager):
+    def is_user_relation(self, obj, annotation, manager):
         request = self.context.get('request')
-        return (
-            request.user.is_authenticated and manager.filter(user=request.user).exists()
-        )
+        if not request.user.is_authenticated:
+            return False
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
+        return manager.filter(user=request.user).exists()
 
     def get_is_favorited(self, obj):
-        return self.is_user_relation(obj.favorites)
+        return self.is_user_relation(obj, 'is_favorited', obj.favorites)
 
     def get_is_in_shopping_cart(self, obj):
-        return self.is_user_relation(obj.shopping_carts)
+        return self.is_user_relation(obj, 'is_in_shopping_cart', obj.shopping_carts)
 
 
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = PrimaryKeyValueField(queryset=Ingredient.objects.all())
 
     class Meta:
         fields = ('id', 'amount')
@@ -74,6 +85,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientWriteSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField()
+    _recipe_ingredients = None
 
     class Meta:
         fields = (
@@ -94,34 +106,119 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
             for item in ingredients_data
         ]
-        RecipeIngredient.objects.bulk_create(recipeingredient_list)
+        if recipeingredient_list:
+            RecipeIngredient.objects.bulk_create(recipeingredient_list)
+            transaction.on_commit(
+                partial(record_recipe_ingredient_changes, [recipe.pk])
+            )
+        return recipeingredient_list
+
+    def __update_ingredients(self, recipe, ingredients_data):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        amounts = {item['id'].pk: item['amount'] for item in ingredients_data}
+        deleted = [
+            recipe_ingredient.pk
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is not None and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if deleted:
+            RecipeIngredient.objects.filter(pk__in=deleted).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = self.__save_ingredients(
+            recipe, [item for item in ingredients_data if item['id'].pk not in current]
+        )
+        return [
+            recipe_ingredient
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id in amounts
+        ] + added
+
+    def __cache_ingredients(self, recipe, recipe_ingredients):
+        queryset = recipe.recipe_ingredients.all()
+        queryset._result_cache = sorted(
+            recipe_ingredients,
+            key=lambda recipe_ingredient: recipe_ingredient.ingredient.name,
+        )
+        queryset._prefetch_done = True
+        self._recipe_ingredients = queryset
+
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = data.dict()
+            try:
+                data['ingredients'] = json.loads(data.get('ingredients', '[]'))
+            except json.JSONDecodeError:
+                raise serializers.ValidationError(
+                    {'ingredients': 'Ожидается список ингредиентов в формате JSON'}
+                )
+        return super().to_internal_value(data)
 
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
+        ingredients = data.get('ingredients')
         if not ingredients:
             raise serializers.ValidationError(
                 {'ingredients': 'Список ингредиентов не может быть пустым'}
             )
-        ingredients_id_set = set(ingredient.get('id') for ingredient in ingredients)
+        ingredients_id_set = set(ingredient['id'] for ingredient in ingredients)
         if len(ingredients_id_set) != len(ingredients):
             raise serializers.ValidationError(
                 {'ingredients': 'id ингрединтов дублируются'}
             )
+        ingredients_by_id = Ingredient.objects.in_bulk(ingredients_id_set)
+        errors = [
+            {}
+            if ingredient['id'] in ingredients_by_id
+            else {
+                'id': [
+                    PrimaryKeyValueField.default_error_messages[
+                        'does_not_exist'
+                    ].format(pk_value=ingredient['id'])
+                ]
+            }
+            for ingredient in ingredients
+        ]
+        if any(errors):
+            raise serializers.ValidationError({'ingredients': errors})
+        for ingredient in ingredients:
+            ingredient['id'] = ingredients_by_id[ingredient['id']]
         return super().validate(data)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_list = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        self.__save_ingredients(recipe, ingredients_list)
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
+        self.__cache_ingredients(
+            recipe, self.__save_ingredients(recipe, ingredients_list)
+        )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        if validated_data.get('image') is instance.image:
+            del validated_data['image']
         ingredients_data = validated_data.pop('ingredients', None)
-        instance.recipe_ingredients.all().delete()
-        self.__save_ingredients(instance, ingredients_data)
+        if ingredients_data is not None:
+            self.__cache_ingredients(
+                instance, self.__update_ingredients(instance, ingredients_data)
+            )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        if self._recipe_ingredients is not None:
+            instance._prefetched_objects_cache = {
+                'recipe_ingredients': self._recipe_ingredients
+            }
         return RecipeReadSerializer(instance, context=self.context).data
 
 
@@ -145,3 +242,11 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         recipe = instance.recipe
         serializer = SimpleRecipeSerializer(recipe)
         return serializer.to_representation(recipe)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES,
+    )
@@ -3,7 +3,6 @@ from rest_framework import serializers
 
 from api.serializers.recipes import SimpleRecipeSerializer
 from api.serializers.users import CustomUserSerializer
-from recipes.models import Recipe
 from users.models import Subscription
 
 
@@ -29,19 +28,32 @@ class CreateSubscriptionSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if not recipes_limit:
+        return None
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        recipes_limit = -1
+    if recipes_limit < 0:
+        raise serializers.ValidationError({'recipes_limit': 'Не является числом'})
+    return recipes_limit
+
+
 class SubscriptionSerializer(CustomUserSerializer):
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        payload = CustomUserSerializer(instance, context=self.context).data
-        recipes = Recipe.objects.filter(author=instance)
-        payload['recipes_count'] = len(recipes)
-        if recipes_limit:
-            try:
-                recipes = recipes[: int(recipes_limit)]
-            except ValueError:
-                raise serializers.ValidationError(
-                    {'recipes_limit': 'Не является числом'}
-                )
-        payload['recipes'] = SimpleRecipeSerializer(recipes, many=True).data
-        return payload
+    recipes_count = serializers.ReadOnlyField()
+    recipes = serializers.SerializerMethodField()
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = CustomUserSerializer.Meta.fields + ('recipes_count', 'recipes')
+
+    def get_recipes(self, obj):
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
+        return SimpleRecipeSerializer(recipes, many=True).data
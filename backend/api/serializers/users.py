@@ -2,14 +2,31 @@ from django.contrib.auth import get_user_model
 from djoser import serializers as d_serializers
 from rest_framework import serializers
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageVariantsField
 
 
 User = get_user_model()
 
 
+def get_subscribed_author_ids(request):
+    if not hasattr(request, '_subscribed_author_ids'):
+        request._subscribed_author_ids = set(
+            request.user.subscriptions.values_list('author_id', flat=True)
+        )
+    return request._subscribed_author_ids
+
+
+def is_subscribed(request, author):
+    if not request.user.is_authenticated:
+        return False
+    if hasattr(author, 'is_subscribed'):
+        return author.is_subscribed
+    return author.pk in get_subscribed_author_ids(request)
+
+
 class CustomUserSerializer(d_serializers.UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
@@ -21,14 +38,11 @@ class CustomUserSerializer(d_serializers.UserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (
-            request.user.is_authenticated
-            and obj.subscribers.filter(user=request.user).exists()
-        )
+        return is_subscribed(self.context.get('request'), obj)
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -0,0 +1,892 @@
+import base64
+import io
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.authentication import get_token_version_key, token_cache
+from api.metrics import RequestMetrics, get_measured_serializer_class
+from api.serializers.recipes import IngredientSerializer
+from recipes.autocomplete import ingredient_index
+from recipes.catalog import import_catalog
+from recipes.feed import backfill_feed
+from recipes.images import ImmediateQueue, ThreadPoolQueue, generate_image_variants
+from recipes.matching import RecipeIngredientIndex, recipe_ingredient_index
+from recipes.search import update_search_index
+from recipes.indexes import BackgroundIndex
+from recipes.models import (
+    Favorite,
+    FeedItem,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+from users.models import CustomUser, Subscription
+
+
+# Внутри TestCase каждый transaction.atomic() добавляет SAVEPOINT и RELEASE.
+QUERY_BUDGETS = {
+    ('api-root', 'GET'): 1,
+    ('metrics', 'GET'): 0,
+    ('login', 'POST'): 3,
+    ('logout', 'POST'): 3,
+    ('user-list', 'GET'): 3,
+    ('user-list', 'POST'): 5,
+    ('user-me', 'GET'): 2,
+    ('user-me', 'PATCH'): 3,
+    ('user-change-avatar', 'PUT'): 2,
+    ('user-change-avatar', 'DELETE'): 2,
+    ('user-set-password', 'POST'): 2,
+    ('user-subscriptions', 'GET'): 4,
+    ('user-detail', 'GET'): 2,
+    ('user-subscribe', 'POST'): 9,
+    ('user-subscribe', 'DELETE'): 7,
+    ('ingredient-list', 'GET'): 2,
+    ('ingredient-detail', 'GET'): 2,
+    ('recipe-list', 'GET'): 6,
+    ('recipe-list', 'POST'): 8,
+    ('recipe-detail', 'GET'): 5,
+    ('recipe-detail', 'PATCH'): 9,
+    ('recipe-detail', 'DELETE'): 13,
+    ('recipe-top', 'GET'): 6,
+    ('recipe-feed', 'GET'): 7,
+    ('recipe-download-shopping-card', 'GET'): 2,
+    ('recipe-get-link', 'GET'): 6,
+    ('recipe-favorite', 'POST'): 10,
+    ('recipe-favorite', 'DELETE'): 8,
+    ('recipe-shopping-card', 'POST'): 10,
+    ('recipe-shopping-card', 'DELETE'): 8,
+    ('recipe-favorite-bulk', 'POST'): 8,
+    ('recipe-favorite-bulk', 'DELETE'): 8,
+    ('recipe-shopping-cart-bulk', 'POST'): 8,
+    ('recipe-shopping-cart-bulk', 'DELETE'): 8,
+}
+UNBUDGETED_ROUTES = {
+    'user-activation',
+    'user-resend-activation',
+    'user-reset-password',
+    'user-reset-password-confirm',
+    'user-reset-username',
+    'user-reset-username-confirm',
+    'user-set-username',
+}
+PAGE_SIZES = (1, 50)
+PASSWORD = 'Budget-password-42'
+MEDIA_ROOT = tempfile.mkdtemp()
+TOKEN_CACHE_ROOT = tempfile.mkdtemp()
+
+
+def get_route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def create_user(name):
+    return CustomUser.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name='Тест',
+        last_name='Тестов',
+        password=PASSWORD,
+    )
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'query-budgets',
+        }
+    },
+    MEDIA_ROOT=MEDIA_ROOT,
+    PERFORMANCE_METRICS={**settings.PERFORMANCE_METRICS, 'ENABLED': True},
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('budget')
+        cls.token = Token.objects.create(user=cls.user)
+        authors = [create_user(f'author{number}') for number in range(3)]
+        cls.author = authors[0]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'молоко', 'масло')
+        ]
+        image = default_storage.save(
+            'recipes/images/budget.png', ContentFile(make_image())
+        )
+        recipes = []
+        for author in authors:
+            for number in range(2):
+                recipe = Recipe.objects.create(
+                    author=author,
+                    name=f'Рецепт {number}',
+                    text='Описание',
+                    cooking_time=10 + number,
+                    image=image,
+                )
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+                    for ingredient in cls.ingredients
+                )
+                recipes.append(recipe)
+        cls.recipe = recipes[0]
+        for recipe in recipes[2:]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in authors[1:]:
+            Subscription.objects.create(user=cls.user, author=author)
+        backfill_feed(Subscription.objects.all())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        patcher = mock.patch.object(BackgroundIndex, 'build_in_background')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.anonymous_client = APIClient()
+
+    def set_password(self):
+        self.user.set_password(PASSWORD)
+        self.user.save(update_fields=['password'])
+
+    def create_recipe(self):
+        recipe = Recipe.objects.create(
+            author=self.user,
+            name='Рецепт для проверки',
+            text='Описание',
+            cooking_time=10,
+            image=self.recipe.image.name,
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients
+        )
+        return {'pk': recipe.pk}
+
+    def get_cases(self):
+        user, recipe, author = self.user, self.recipe, self.author
+        image = 'data:image/png;base64,' + base64.b64encode(make_image()).decode()
+        recipe_data = {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10} for ingredient in self.ingredients
+            ],
+            'image': image,
+            'name': 'Рецепт для проверки',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+        recipe_ids = {'recipes': [recipe.pk]}
+        return {
+            ('api-root', 'GET'): {},
+            ('metrics', 'GET'): {},
+            ('login', 'POST'): {
+                'anonymous': True,
+                'prepare': self.set_password,
+                'data': {'email': user.email, 'password': PASSWORD},
+            },
+            ('logout', 'POST'): {},
+            ('user-list', 'GET'): {
+                'paginated': True,
+                'prepare': lambda: CustomUser.objects.filter(pk=user.pk).update(
+                    is_staff=True
+                ),
+            },
+            ('user-list', 'POST'): {
+                'anonymous': True,
+                'data': {
+                    'email': 'new@example.com',
+                    'username': 'new',
+                    'first_name': 'Тест',
+                    'last_name': 'Тестов',
+                    'password': PASSWORD,
+                },
+            },
+            ('user-me', 'GET'): {},
+            ('user-me', 'PATCH'): {'data': {'first_name': user.first_name}},
+            ('user-change-avatar', 'PUT'): {'data': {'avatar': image}},
+            ('user-change-avatar', 'DELETE'): {},
+            ('user-set-password', 'POST'): {
+                'prepare': self.set_password,
+                'data': {
+                    'current_password': PASSWORD,
+                    'new_password': PASSWORD + '!',
+                },
+            },
+            ('user-subscriptions', 'GET'): {
+                'paginated': True,
+                'params': {'recipes_limit': 3},
+            },
+            ('user-detail', 'GET'): {'kwargs': {'id': author.pk}},
+            ('user-subscribe', 'POST'): {'kwargs': {'id': author.pk}},
+            ('user-subscribe', 'DELETE'): {
+                'kwargs': {'id': author.pk},
+                'prepare': lambda: Subscription.objects.create(
+                    user=user, author=author
+                ),
+            },
+            ('ingredient-list', 'GET'): {'params': {'name': 'м'}},
+            ('ingredient-detail', 'GET'): {'kwargs': {'pk': self.ingredients[0].pk}},
+            ('recipe-list', 'GET'): {'paginated': True},
+            ('recipe-list', 'POST'): {'data': recipe_data},
+            ('recipe-detail', 'GET'): {'kwargs': {'pk': recipe.pk}},
+            ('recipe-detail', 'PATCH'): {
+                'kwargs': self.create_recipe,
+                'data': recipe_data,
+            },
+            ('recipe-detail', 'DELETE'): {'kwargs': self.create_recipe},
+            ('recipe-top', 'GET'): {'paginated': True},
+            ('recipe-feed', 'GET'): {'paginated': True},
+            ('recipe-download-shopping-card', 'GET'): {},
+            ('recipe-get-link', 'GET'): {'kwargs': {'pk': recipe.pk}},
+            ('recipe-favorite', 'POST'): {'kwargs': {'pk': recipe.pk}},
+            ('recipe-favorite', 'DELETE'): {
+                'kwargs': {'pk': recipe.pk},
+                'prepare': lambda: Favorite.objects.create(user=user, recipe=recipe),
+            },
+            ('recipe-shopping-card', 'POST'): {'kwargs': {'pk': recipe.pk}},
+            ('recipe-shopping-card', 'DELETE'): {
+                'kwargs': {'pk': recipe.pk},
+                'prepare': lambda: ShoppingCart.objects.create(
+                    user=user, recipe=recipe
+                ),
+            },
+            ('recipe-favorite-bulk', 'POST'): {'data': recipe_ids},
+            ('recipe-favorite-bulk', 'DELETE'): {
+                'data': recipe_ids,
+                'prepare': lambda: Favorite.objects.create(user=user, recipe=recipe),
+            },
+            ('recipe-shopping-cart-bulk', 'POST'): {'data': recipe_ids},
+            ('recipe-shopping-cart-bulk', 'DELETE'): {
+                'data': recipe_ids,
+                'prepare': lambda: ShoppingCart.objects.create(
+                    user=user, recipe=recipe
+                ),
+            },
+        }
+
+    def request(self, route, method, case, params):
+        with transaction.atomic():
+            if 'prepare' in case:
+                case['prepare']()
+            kwargs = case.get('kwargs', {})
+            if callable(kwargs):
+                kwargs = kwargs()
+            client = self.anonymous_client if case.get('anonymous') else self.client
+            url = reverse(route, kwargs=kwargs)
+            cache.clear()
+            with self.assertNumQueries(QUERY_BUDGETS[route, method]):
+                if method == 'GET':
+                    response = client.get(url, params)
+                else:
+                    response = getattr(client, method.lower())(
+                        url, case.get('data'), format='json'
+                    )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response
+
+    def test_every_route_has_budget(self):
+        routes = set(get_route_names(api_urls.urlpatterns)) - UNBUDGETED_ROUTES
+        self.assertEqual(routes, {route for route, _ in QUERY_BUDGETS})
+        self.assertEqual(QUERY_BUDGETS.keys(), self.get_cases().keys())
+
+    def test_query_budgets(self):
+        for (route, method), case in self.get_cases().items():
+            page_sizes = PAGE_SIZES if case.get('paginated') else (None,)
+            for page_size in page_sizes:
+                params = dict(case.get('params', {}))
+                if page_size is not None:
+                    params['limit'] = page_size
+                with self.subTest(route=route, method=method, limit=page_size):
+                    response = self.request(route, method, case, params)
+                    self.assertLess(
+                        response.status_code, 400, getattr(response, 'data', None)
+                    )
+                    if page_size == PAGE_SIZES[-1]:
+                        self.assertGreater(len(response.data['results']), 1)
+
+
+class DenormalizedFieldsTests(TestCase):
+    def test_save_keeps_counters(self):
+        author = create_user('counters')
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='x.png',
+        )
+        stale_author = CustomUser.objects.get(pk=author.pk)
+        stale_recipe = Recipe.objects.get(pk=recipe.pk)
+        Favorite.objects.create(user=author, recipe=recipe)
+        Subscription.objects.create(user=create_user('follower'), author=author)
+        stale_recipe.name = 'Новое название'
+        stale_recipe.save()
+        stale_author.first_name = 'Новое имя'
+        stale_author.save()
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(author.first_name, 'Новое имя')
+        self.assertEqual(author.subscribers_count, 1)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredient = Ingredient.objects.create(name='мука', measurement_unit='г')
+        recipe = Recipe.objects.create(
+            author=create_user('cursor'),
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='x.png',
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=cls.ingredient, amount=10
+        )
+
+    def setUp(self):
+        patcher = mock.patch.object(BackgroundIndex, 'build_in_background')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def test_cursor_requires_id_ordering(self):
+        url = reverse('recipe-list')
+        response = self.client.get(url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        for params in (
+            {'ordering': 'popular'},
+            {'ordering': 'cooking_time'},
+            {'ingredients': self.ingredient.pk},
+            {'search': 'рецепт'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, {'pagination': 'cursor', **params})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('pagination', response.data)
+
+
+class IngredientSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('молоко', 'Масло', 'мука', 'сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def test_first_request_uses_index(self):
+        cache.clear()
+        ingredient_index.version = None
+        for prefix in ('м', 'М'):
+            with self.subTest(prefix=prefix):
+                response = self.client.get(reverse('ingredient-list'), {'name': prefix})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [ingredient['name'] for ingredient in response.data],
+                    ['Масло', 'молоко', 'мука'],
+                )
+                self.assertIn('ETag', response)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.writer = create_user('writer')
+        cls.author = create_user('cached')
+        cls.ingredient = Ingredient.objects.create(name='мука', measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image=default_storage.save(
+                'recipes/images/cached.png', ContentFile(make_image())
+            ),
+        )
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('recipes.images._queue', ImmediateQueue())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+        self.writer_client = APIClient()
+        self.writer_client.force_authenticate(self.writer)
+        self.anonymous_client = APIClient()
+
+    def get_recipes(self, client):
+        response = client.get(reverse('recipe-list'))
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id']: recipe for recipe in response.data['results']}
+
+    def write(self, method, route, kwargs=None, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.writer_client, method)(
+                reverse(route, kwargs=kwargs), data, format='json'
+            )
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        return response
+
+    def assert_no_user_flags(self, recipes):
+        for recipe in recipes.values():
+            self.assertFalse(recipe['is_favorited'])
+            self.assertFalse(recipe['is_in_shopping_cart'])
+            self.assertFalse(recipe['author']['is_subscribed'])
+
+    def test_relation_writes_update_overlays(self):
+        recipe_id, author_id = self.recipe.pk, self.author.pk
+        cases = (
+            ('recipe-favorite', {'pk': recipe_id}, ('is_favorited',)),
+            ('recipe-shopping-card', {'pk': recipe_id}, ('is_in_shopping_cart',)),
+            ('user-subscribe', {'id': author_id}, ('author', 'is_subscribed')),
+        )
+        for client in (self.reader_client, self.writer_client, self.anonymous_client):
+            self.get_recipes(client)
+        for route, kwargs, path in cases:
+            for method, expected in (('post', True), ('delete', False)):
+                with self.subTest(route=route, method=method):
+                    self.write(method, route, kwargs)
+                    value = self.get_recipes(self.writer_client)[recipe_id]
+                    for key in path:
+                        value = value[key]
+                    self.assertIs(value, expected)
+                    with self.assertNumQueries(0):
+                        self.assert_no_user_flags(self.get_recipes(self.reader_client))
+                    self.assert_no_user_flags(self.get_recipes(self.anonymous_client))
+
+    def test_recipe_write_updates_cached_pages(self):
+        for client in (self.reader_client, self.writer_client, self.anonymous_client):
+            self.get_recipes(client)
+        image = 'data:image/png;base64,' + base64.b64encode(make_image()).decode()
+        data = {
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 10}],
+            'image': image,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        response = self.write('post', 'recipe-list', data=data)
+        new_id = response.data['id']
+        self.write('post', 'recipe-favorite', {'pk': new_id})
+        for client in (self.reader_client, self.anonymous_client):
+            recipes = self.get_recipes(client)
+            self.assertEqual(set(recipes), {self.recipe.pk, new_id})
+            self.assert_no_user_flags(recipes)
+        recipes = self.get_recipes(self.writer_client)
+        self.assertTrue(recipes[new_id]['is_favorited'])
+        self.assertFalse(recipes[self.recipe.pk]['is_favorited'])
+        self.write(
+            'patch', 'recipe-detail', {'pk': new_id}, {**data, 'name': 'Изменённый'}
+        )
+        recipes = self.get_recipes(self.reader_client)
+        self.assertEqual(recipes[new_id]['name'], 'Изменённый')
+        self.assert_no_user_flags(recipes)
+        self.assertTrue(self.get_recipes(self.writer_client)[new_id]['is_favorited'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('images')
+        cls.ingredient = Ingredient.objects.create(name='мука', measurement_unit='г')
+
+    def setUp(self):
+        patcher = mock.patch('recipes.images._queue', ImmediateQueue())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.image = 'data:image/png;base64,' + base64.b64encode(make_image()).decode()
+
+    def assert_variants(self, variants, stored, names):
+        self.assertEqual(set(variants), set(names))
+        for name, formats in variants.items():
+            self.assertEqual(set(formats), {'webp', 'jpeg'})
+            for extension, url in formats.items():
+                path = stored['variants'][name][extension]
+                self.assertTrue(default_storage.exists(path))
+                self.assertEqual(url, 'http://testserver' + default_storage.url(path))
+
+    def test_recipe_image_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('recipe-list'),
+                {
+                    'ingredients': [{'id': self.ingredient.pk, 'amount': 10}],
+                    'image': self.image,
+                    'name': 'Рецепт',
+                    'text': 'Описание',
+                    'cooking_time': 5,
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        response = self.client.get(reverse('recipe-detail', kwargs={'pk': recipe.pk}))
+        self.assert_variants(
+            response.data['image_variants'], recipe.image_variants, ('card', 'detail')
+        )
+
+    def test_avatar_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('user-change-avatar'), {'avatar': self.image}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_variants['source'], self.user.avatar.name)
+        response = self.client.get(reverse('user-detail', kwargs={'id': self.user.pk}))
+        self.assert_variants(
+            response.data['avatar_variants'], self.user.avatar_variants, ('avatar',)
+        )
+
+    def test_thread_pool_logs_errors(self):
+        queue = ThreadPoolQueue(1)
+        self.addCleanup(queue.executor.shutdown)
+        with (
+            mock.patch('recipes.images.connection') as connection,
+            self.assertLogs('recipes.images', 'ERROR'),
+        ):
+            queue.run(mock.Mock(side_effect=OSError))
+        connection.close.assert_called_once_with()
+
+
+class RecipeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('search')
+        flour = Ingredient.objects.create(name='мука', measurement_unit='г')
+        chicken = Ingredient.objects.create(name='курица', measurement_unit='г')
+        cls.recipes = {}
+        for name, text, ingredient in (
+            ('Блины', 'Тонкие и румяные', flour),
+            ('Пирог', 'Почти как блины, только толще', flour),
+            ('Суп', 'Наваристый', chicken),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=10, image='x.png'
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10
+            )
+            cls.recipes[name] = recipe.pk
+        update_search_index(Recipe.objects.all())
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, value):
+        response = self.client.get(reverse('recipe-list'), {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search(self):
+        recipes = self.recipes
+        self.assertEqual(self.search('блины'), [recipes['Блины'], recipes['Пирог']])
+        self.assertEqual(self.search('курица'), [recipes['Суп']])
+        self.assertEqual(self.search('пицца'), [])
+
+    def test_search_vector_is_deferred(self):
+        recipe = Recipe.objects.get(pk=self.recipes['Суп'])
+        self.assertIn('search_vector', recipe.get_deferred_fields())
+
+
+class RecipeIngredientIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('matching')
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'молоко', 'яйца')
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='x.png',
+            )
+            for number in range(3)
+        ]
+        flour, milk, eggs = cls.ingredients
+        for recipe, ingredients in zip(cls.recipes, ((flour, milk), (milk, eggs))):
+            for ingredient in ingredients:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                )
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(BackgroundIndex, 'build_in_background')
+        self.build_in_background = patcher.start()
+        self.addCleanup(patcher.stop)
+        recipe_ingredient_index.build(recipe_ingredient_index.get_version())
+
+    def get_match(self, *ingredients):
+        response = self.client.get(
+            reverse('recipe-list'),
+            {'ingredients': ','.join(str(ingredient.pk) for ingredient in ingredients)},
+        )
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def change_ingredients(self):
+        flour, milk, eggs = self.ingredients
+        first, second, third = self.recipes
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(recipe=second, ingredient=flour, amount=5)
+            RecipeIngredient.objects.filter(recipe=first, ingredient=milk).delete()
+            RecipeIngredient.objects.create(recipe=third, ingredient=eggs, amount=5)
+
+    def test_changes_update_postings(self):
+        flour, milk, eggs = self.ingredients
+        first, second, third = self.recipes
+        self.assertEqual(self.get_match(flour, milk), {first.pk})
+        self.change_ingredients()
+        with mock.patch.object(RecipeIngredientIndex, 'load') as load:
+            self.assertEqual(self.get_match(flour, milk), {second.pk})
+            self.assertEqual(self.get_match(eggs), {second.pk, third.pk})
+        load.assert_not_called()
+        postings, recipes = recipe_ingredient_index.get_state()
+        expected_postings, expected_recipes = recipe_ingredient_index.load()
+        self.assertEqual(postings, expected_postings)
+        self.assertEqual(
+            {recipe_id: set(ingredients) for recipe_id, ingredients in recipes.items()},
+            {
+                recipe_id: set(ingredients)
+                for recipe_id, ingredients in expected_recipes.items()
+            },
+        )
+
+    def test_missing_change_rebuilds(self):
+        self.change_ingredients()
+        epoch, number = recipe_ingredient_index.get_version()
+        cache.delete(f'recipe_ingredient_index_change:{epoch}:{number}')
+        self.assertIsNone(recipe_ingredient_index.get_state())
+        self.build_in_background.assert_called_once_with((epoch, number))
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.other = create_user('other')
+        cls.author = create_user('regular')
+        cls.celebrity = create_user('celebrity')
+        cls.recipe_ids = []
+        for number, author in enumerate(
+            (cls.author, cls.celebrity, cls.author, cls.celebrity, cls.author)
+        ):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='x.png',
+            )
+            cls.recipe_ids.insert(0, recipe.pk)
+        for user, author in (
+            (cls.reader, cls.author),
+            (cls.reader, cls.celebrity),
+            (cls.other, cls.celebrity),
+        ):
+            Subscription.objects.create(user=user, author=author)
+
+    def setUp(self):
+        patcher = mock.patch('recipes.feed.FEED_FANOUT_MAX_SUBSCRIBERS', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backfill_feed(Subscription.objects.all())
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get_pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([recipe['id'] for recipe in response.data['results']])
+            url = response.data['next']
+        return pages, response.data['previous']
+
+    def test_feed_merges_fan_out_and_celebrity_recipes(self):
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.reader, author=self.celebrity).exists()
+        )
+        pages, previous = self.get_pages(reverse('recipe-feed') + '?limit=2')
+        ids = self.recipe_ids
+        self.assertEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+        response = self.client.get(previous)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']], ids[2:4]
+        )
+
+    def test_author_below_threshold_is_backfilled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                reverse('user-subscribe', kwargs={'id': self.celebrity.pk})
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader, author=self.celebrity).count(),
+            0,
+        )
+        self.client.force_authenticate(self.other)
+        self.assertEqual(
+            set(
+                FeedItem.objects.filter(user=self.other).values_list(
+                    'recipe_id', flat=True
+                )
+            ),
+            {self.recipe_ids[1], self.recipe_ids[3]},
+        )
+        pages, _ = self.get_pages(reverse('recipe-feed'))
+        self.assertEqual(pages, [[self.recipe_ids[1], self.recipe_ids[3]]])
+
+
+class ImportCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('imported')
+        cls.follower = create_user('follower')
+        Subscription.objects.create(user=cls.follower, author=cls.author)
+        Ingredient.objects.create(name='мука', measurement_unit='г')
+
+    def import_recipe(self, name):
+        row = {
+            'id': 100,
+            'author': self.author.pk,
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'ingredients': [{'name': 'мука', 'amount': 100}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            import_catalog('recipes', [row], batch_size=10)
+        return Recipe.objects.get(pk=100)
+
+    def test_import_updates_recipes_and_feeds(self):
+        recipe = self.import_recipe('Блины')
+        self.assertEqual(
+            list(
+                FeedItem.objects.filter(user=self.follower).values_list(
+                    'recipe_id', flat=True
+                )
+            ),
+            [recipe.pk],
+        )
+        updated = self.import_recipe('Оладьи')
+        self.assertEqual(updated.name, 'Оладьи')
+        self.assertGreater(updated.updated_at, recipe.updated_at)
+        self.assertEqual(FeedItem.objects.filter(user=self.follower).count(), 1)
+
+
+class SerializationMetricsTests(TestCase):
+    def test_serializer_data_is_measured(self):
+        request = RequestFactory().get('/')
+        metrics = request.performance_metrics = RequestMetrics(request)
+        serializer_class = get_measured_serializer_class(IngredientSerializer)
+        with mock.patch.object(
+            IngredientSerializer,
+            'to_representation',
+            side_effect=lambda instance: time.sleep(0.01) or {},
+        ):
+            serializer_class(Ingredient(), context={'request': request}).data
+        self.assertGreaterEqual(metrics.serialization, 0.01)
+        self.assertIsInstance(serializer_class(), IngredientSerializer)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': TOKEN_CACHE_ROOT,
+        }
+    },
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class TokenCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('token')
+        cls.token = Token.objects.create(user=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TOKEN_CACHE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        token_cache.items.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(reverse('user-me'))
+        return response
+
+    def test_warm_token_skips_user_query(self):
+        self.assertEqual(self.get_me(2).status_code, 200)
+        self.assertEqual(self.get_me(1).data['email'], self.user.email)
+        token_cache.items.clear()
+        self.assertEqual(self.get_me(1).status_code, 200)
+
+    def test_shared_version_invalidates_local_entry(self):
+        self.get_me(2)
+        cache.set(get_token_version_key(self.token.key), 'changed')
+        self.get_me(2)
+        self.get_me(1)
+
+    def test_inactive_user_is_rejected(self):
+        self.get_me(2)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('user-me')).status_code, 401)
+
+    def test_avatar_variants_invalidate_token(self):
+        self.get_me(2)
+        name = default_storage.save('users/images/token.png', ContentFile(make_image()))
+        CustomUser.objects.filter(pk=self.user.pk).update(avatar=name)
+        generate_image_variants('users.CustomUser', self.user.pk)
+        response = self.get_me(2)
+        self.assertEqual(set(response.data['avatar_variants']), {'avatar'})
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.views.metrics import metrics
 from api.views.users import CustomUserViewSet
 from api.views import recipes
 
@@ -13,6 +14,7 @@ user_router.register('users', CustomUserViewSet, basename='user')
 
 
 urlpatterns = [
+    path('_metrics', metrics, name='metrics'),
     path('', include(user_router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
     path('', include(router.urls)),
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from api.metrics import render_metrics
+
+
+def metrics(request):
+    if not settings.PERFORMANCE_METRICS['ENABLED']:
+        raise Http404
+    return HttpResponse(
+        render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
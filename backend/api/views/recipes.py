@@ -1,9 +1,15 @@
+import copy
 from typing import Union
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework import viewsets
@@ -11,63 +17,196 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.request import Request as BaseRequests, HttpRequest
 from rest_framework.response import Response
-from rest_framework.filters import OrderingFilter
 
-from api.filters import NameSearchFilter, RecipeFilter
-from api.pagination import DefaultPagination
+from api.caching import (
+    EMPTY_RECIPE_OVERLAY,
+    apply_recipe_overlay,
+    extract_recipe_overlay,
+    get_not_modified_response,
+    get_recipe_list_cache_keys,
+    make_etag,
+    patch_user_cache_control,
+    set_validators,
+)
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.metrics import SerializationMetricsMixin
+from api.negotiation import IgnoreFormatContentNegotiation
+from api.pagination import (
+    CursorSwitchPagination,
+    DefaultPagination,
+    IdCursorPagination,
+)
 from api.permissions import RecipePermission
 from api.serializers.recipes import (
     FavoriteSerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     ShoppingCartSerializer,
+    SimpleRecipeSerializer,
 )
+from api.serializers.users import get_subscribed_author_ids, is_subscribed
+from constants import INGREDIENTS_CACHE_MAX_AGE, RECIPE_LIST_CACHE_TIMEOUT
+from recipes.autocomplete import get_ingredient_index_version, ingredient_index
+from recipes.feed import get_feed
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
-from recipes.utils import get_csv_data
+from recipes.relations import (
+    add_recipe_relations,
+    lock_user,
+    remove_recipe_relations,
+)
+from recipes.shortlinks import get_short_link_code
+from recipes.utils import POPULARITY_PERIODS, SHOPPING_LIST_FORMATS, count_by
 
 
 User = get_user_model()
 Request = Union[BaseRequests, HttpRequest]
 
 
-class IngridientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngridientViewSet(SerializationMetricsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (NameSearchFilter,)
-    search_fields = ('^name',)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = IngredientFilter
+
+    def finalize_response(self, request: Request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            set_validators(response, self.get_etag())
+            patch_cache_control(
+                response, public=True, max_age=INGREDIENTS_CACHE_MAX_AGE
+            )
+        return response
+
+    def get_etag(self):
+        return make_etag('ingredients', get_ingredient_index_version())
+
+    def list(self, request: Request, *args, **kwargs):
+        not_modified = get_not_modified_response(request, self.get_etag())
+        if not_modified is not None:
+            return not_modified
+        return Response(ingredient_index.search(request.query_params.get('name', '')))
+
+    def retrieve(self, request: Request, *args, **kwargs):
+        not_modified = get_not_modified_response(request, self.get_etag())
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.prefetch_related('recipe_ingredients')
+class RecipeViewSet(SerializationMetricsMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        'recipe_ingredients__ingredient'
+    )
     serializer_class = RecipeWriteSerializer
-    pagination_class = DefaultPagination
+    pagination_class = CursorSwitchPagination
     permission_classes = (RecipePermission,)
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
     ordering = ('-id',)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(
+                    Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+                ),
+                is_in_shopping_cart=Exists(
+                    ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+                ),
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_recipe_overlay(self, data):
+        user = self.request.user
+        recipe_ids = [recipe['id'] for recipe in data['results']]
+        return {
+            'favorited': set(
+                Favorite.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list('recipe_id', flat=True)
+            ),
+            'in_shopping_cart': set(
+                ShoppingCart.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list('recipe_id', flat=True)
+            ),
+            'subscribed': get_subscribed_author_ids(self.request)
+            & {recipe['author']['id'] for recipe in data['results']},
+        }
+
+    def list(self, request: Request, *args, **kwargs):
+        page_key, overlay_key = get_recipe_list_cache_keys(request)
+        data = cache.get(page_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            public_data = apply_recipe_overlay(
+                copy.deepcopy(data), EMPTY_RECIPE_OVERLAY
+            )
+            cache.set(page_key, public_data, RECIPE_LIST_CACHE_TIMEOUT)
+            if overlay_key is not None:
+                cache.set(
+                    overlay_key,
+                    extract_recipe_overlay(data),
+                    RECIPE_LIST_CACHE_TIMEOUT,
+                )
+        elif overlay_key is not None:
+            overlay = cache.get(overlay_key)
+            if overlay is None:
+                overlay = self.get_recipe_overlay(data)
+                cache.set(overlay_key, overlay, RECIPE_LIST_CACHE_TIMEOUT)
+            apply_recipe_overlay(data, overlay)
+        return patch_user_cache_control(request, Response(data))
+
+    def retrieve(self, request: Request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = max(instance.updated_at, instance.author.updated_at)
+        etag = make_etag(
+            'recipe',
+            instance.pk,
+            last_modified.timestamp(),
+            request.user.pk,
+            getattr(instance, 'is_favorited', False),
+            getattr(instance, 'is_in_shopping_cart', False),
+            is_subscribed(request, instance.author),
+        )
+        if request.user.is_authenticated:
+            last_modified = None
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = set_validators(Response(serializer.data), etag, last_modified)
+        return patch_user_cache_control(request, response)
+
     def perform_create(self, serializer: RecipeWriteSerializer):
         serializer.save(author=self.request.user)
 
     def create_delete_recipe_relation(self, object, serializer, pk, error):
         recipe = get_object_or_404(Recipe, pk=pk)
-        if self.request.method == 'POST':
-            data = {'user': self.request.user.pk, 'recipe': recipe.pk}
-            serializer = serializer(data=data, context={'request': self.request})
-            serializer.is_valid(raise_exception=True)
-            instance = serializer.save()
-            return Response(
-                serializer.to_representation(instance),
-                status=status.HTTP_201_CREATED,
-            )
-        favorite_objs = object.objects.filter(user=self.request.user, recipe=recipe)
-        deleted_count, _ = favorite_objs.delete()
+        with transaction.atomic():
+            lock_user(self.request.user)
+            if self.request.method == 'POST':
+                data = {'user': self.request.user.pk, 'recipe': recipe.pk}
+                serializer = serializer(data=data, context={'request': self.request})
+                serializer.is_valid(raise_exception=True)
+                instance = serializer.save()
+                return Response(
+                    serializer.to_representation(instance),
+                    status=status.HTTP_201_CREATED,
+                )
+            favorite_objs = object.objects.filter(user=self.request.user, recipe=recipe)
+            deleted_count, _ = favorite_objs.delete()
         if deleted_count == 0:
             return Response(
                 status=status.HTTP_400_BAD_REQUEST,
@@ -75,6 +214,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_recipe_relation(self, model):
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        user = self.request.user
+        if self.request.method == 'DELETE':
+            deleted = remove_recipe_relations(model, user, recipe_ids)
+            return Response(
+                [
+                    {
+                        'id': recipe_id,
+                        'status': 'deleted' if recipe_id in deleted else 'not_found',
+                    }
+                    for recipe_id in recipe_ids
+                ]
+            )
+        recipes = Recipe.objects.only('id', 'name', 'image', 'cooking_time').in_bulk(
+            recipe_ids
+        )
+        _, created = add_recipe_relations(model, user, list(recipes))
+        results = []
+        for recipe_id in recipe_ids:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                results.append({'id': recipe_id, 'status': 'not_found'})
+                continue
+            results.append(
+                {
+                    'id': recipe_id,
+                    'status': 'created' if recipe_id in created else 'exists',
+                    'recipe': SimpleRecipeSerializer(
+                        recipe, context=self.get_serializer_context()
+                    ).data,
+                }
+            )
+        return Response(results)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_bulk(self, request: Request):
+        return self.bulk_recipe_relation(Favorite)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request: Request):
+        return self.bulk_recipe_relation(ShoppingCart)
+
     @action(
         methods=['POST', 'DELETE'],
         detail=True,
@@ -102,27 +298,94 @@ class RecipeViewSet(viewsets.ModelViewSet):
             error='Рецепта нет в корзине',
         )
 
-    @action(methods=['GET'], detail=False, url_path='download_shopping_cart')
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='download_shopping_cart',
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatContentNegotiation,
+    )
     def download_shopping_card(self, request: Request):
-        user = request.user
+        shopping_list_format = SHOPPING_LIST_FORMATS.get(
+            request.query_params.get('format', 'csv')
+        )
+        if shopping_list_format is None:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={
+                    'format': f'Доступные форматы: {", ".join(SHOPPING_LIST_FORMATS)}'
+                },
+            )
         ingredients = (
-            ShoppingCart.objects.values(
-                'recipe__recipe_ingredients__ingredient__name',
-                'recipe__recipe_ingredients__ingredient__measurement_unit',
+            ShoppingCart.objects.filter(user=request.user)
+            .values(
+                name=F('recipe__recipe_ingredients__ingredient__name'),
+                measurement_unit=F(
+                    'recipe__recipe_ingredients__ingredient__measurement_unit'
+                ),
             )
-            .filter(user=user)
             .annotate(amount=Sum('recipe__recipe_ingredients__amount'))
+            .order_by('name', 'measurement_unit')
+        )
+        response = StreamingHttpResponse(
+            shopping_list_format['writer'](ingredients.iterator()),
+            content_type=shopping_list_format['content_type'],
         )
-        data = get_csv_data(ingredients)
-        return FileResponse(
-            data,
-            as_attachment=True,
-            filename='shopping_list',
-            content_type='text/csv',
+        extension = shopping_list_format['extension']
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{extension}"'
         )
+        return response
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='top',
+        pagination_class=DefaultPagination,
+    )
+    def top(self, request: Request):
+        period = request.query_params.get('period', 'all')
+        if period != 'all' and period not in POPULARITY_PERIODS:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={'period': 'Доступные периоды: 24h, 7d, all'},
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        field = 'favorites_count'
+        if period != 'all':
+            favorites = Favorite.objects.filter(
+                created__gte=timezone.now() - POPULARITY_PERIODS[period]
+            )
+            field = 'period_favorites_count'
+            queryset = queryset.filter(pk__in=favorites.values('recipe')).annotate(
+                period_favorites_count=count_by(favorites, 'recipe')
+            )
+        page = self.paginate_queryset(queryset.order_by(f'-{field}', '-id'))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='feed',
+        permission_classes=[IsAuthenticated],
+        pagination_class=IdCursorPagination,
+    )
+    def feed(self, request: Request):
+        queryset = get_feed(
+            self.get_queryset(),
+            request.user,
+            self.paginator.decode_cursor(request),
+            self.paginator.get_page_size(request) + 1,
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request: Request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        short_link = request.build_absolute_uri(f'/s/{recipe.pk}')
+        short_link = request.build_absolute_uri(
+            reverse('short-link', args=(get_short_link_code(recipe),))
+        )
         return Response(data={'short-link': short_link}, status=status.HTTP_200_OK)
@@ -1,5 +1,6 @@
 from typing import Union
 
+from django.db.models import Exists, OuterRef, Prefetch, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -8,23 +9,81 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request as BaseRequests, HttpRequest
 from rest_framework.response import Response
 
-from api.pagination import DefaultPagination
+from api.caching import (
+    get_not_modified_response,
+    make_etag,
+    patch_user_cache_control,
+    set_validators,
+)
+from api.metrics import SerializationMetricsMixin
+from api.pagination import CursorSwitchPagination, DefaultPagination
 from api.serializers.subscriptions import (
     CreateSubscriptionSerializer,
     SubscriptionSerializer,
+    get_recipes_limit,
+)
+from api.serializers.users import (
+    AvatarSerializer,
+    CustomUserSerializer,
+    is_subscribed,
 )
-from api.serializers.users import AvatarSerializer, CustomUserSerializer
+from recipes.models import Recipe
 from users.models import CustomUser, Subscription
 
 
 Request = Union[BaseRequests, HttpRequest]
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SerializationMetricsMixin, UserViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     pagination_class = DefaultPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(user=user, author=OuterRef('pk'))
+                )
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'subscriptions':
+            return SubscriptionSerializer
+        return super().get_serializer_class()
+
+    def get_subscriptions_queryset(self):
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        return (
+            CustomUser.objects.filter(subscribers__user=self.request.user)
+            .annotate(is_subscribed=Value(True))
+            .prefetch_related(
+                Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+            )
+        )
+
+    def retrieve(self, request: Request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(
+            'user',
+            instance.pk,
+            instance.updated_at.timestamp(),
+            request.user.pk,
+            is_subscribed(request, instance),
+        )
+        last_modified = None if request.user.is_authenticated else instance.updated_at
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = set_validators(Response(serializer.data), etag, last_modified)
+        return patch_user_cache_control(request, response)
+
     @action(
         methods=['PUT', 'DELETE'],
         detail=False,
@@ -77,11 +136,9 @@ class CustomUserViewSet(UserViewSet):
         detail=False,
         url_path='subscriptions',
         permission_classes=[IsAuthenticated],
+        pagination_class=CursorSwitchPagination,
     )
     def subscriptions(self, request: Request):
-        subs = CustomUser.objects.filter(subscribers__user=self.request.user)
-        page = self.paginate_queryset(subs)
-        serializer = SubscriptionSerializer(
-            page, many=True, context={'request': request}
-        )
+        page = self.paginate_queryset(self.get_subscriptions_queryset())
+        serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
@@ -1,5 +1,8 @@
 DEFAULT_PAGE_SIZE = 6
 
+INGREDIENTS_CACHE_MAX_AGE = 60 * 60 * 24
+RECIPE_LIST_CACHE_TIMEOUT = 60 * 5
+
 MAX_EMAIL_LENGTH = 254
 MAX_FIRSTNAME_LENGTH = 150
 MAX_LASTNAME_LENGTH = 150
@@ -10,3 +13,28 @@ MAX_RECIPE_NAME_LENGTH = 256
 
 MIN_AMOUNT_LENGTH = 1
 MIN_COOKING_TIME_LENGTH = 1
+
+RECIPE_IMAGE_VARIANTS = {'card': (480, 480), 'detail': (1280, 1280)}
+AVATAR_IMAGE_VARIANTS = {'avatar': (160, 160)}
+IMAGE_VARIANT_QUALITY = 80
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+BASE64_CHUNK_SIZE = 64 * 1024
+SHORT_LINK_CODE_LENGTH = 6
+SHORT_LINK_CACHE_SIZE = 10_000
+SHORT_LINK_HITS_BATCH_SIZE = 100
+SHORT_LINK_HITS_FLUSH_INTERVAL = 60
+INGREDIENT_MATCH_LIMIT = 1000
+RECIPE_INGREDIENT_INDEX_MAX_CHANGES = 1000
+RECIPE_INGREDIENT_INDEX_CHANGE_TIMEOUT = 60 * 60
+FEED_FANOUT_MAX_SUBSCRIBERS = 1000
+FEED_BATCH_SIZE = 1000
+MAX_BULK_RECIPES = 100
+CATALOG_BATCH_SIZE = 1000
+CATALOG_READ_CHUNK_SIZE = 64 * 1024
+METRICS_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+METRICS_SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+TOKEN_CACHE_TTL = 60 * 5
+TOKEN_LOCAL_CACHE_SIZE = 10_000
+TOKEN_LOCAL_CACHE_TTL = 30
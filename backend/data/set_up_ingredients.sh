@@ -1,2 +1 @@
-python manage.py shell -c "exec(open('data/load_ingredients.py').read())"
-echo "script executed"
\ No newline at end of file
+python manage.py import_catalog ingredients data/ingredients.json
@@ -112,6 +112,35 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {'BACKEND': 'recipes.storage.ContentAddressedStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+IMAGE_PIPELINE = {
+    'QUEUE': os.getenv('IMAGE_PIPELINE_QUEUE', 'recipes.images.ThreadPoolQueue'),
+    'WORKERS': int(os.getenv('IMAGE_PIPELINE_WORKERS', 2)),
+}
+
+PERFORMANCE_METRICS = {
+    'ENABLED': os.getenv('PERFORMANCE_METRICS', 'false').lower() == 'true',
+    'SLOW_QUERY_MS': float(os.getenv('SLOW_QUERY_MS', 200)),
+}
+
+if PERFORMANCE_METRICS['ENABLED']:
+    MIDDLEWARE.insert(0, 'api.middleware.PerformanceMiddleware')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTHENTICATION_BACKENDS = [
@@ -119,9 +148,7 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    ),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('api.authentication.CachedTokenAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
@@ -7,6 +7,7 @@ from .models import (
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShortLink,
 )
 
 
@@ -25,17 +26,20 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'cooking_time', 'favorites_count')
+    list_display = (
+        'id',
+        'name',
+        'author',
+        'cooking_time',
+        'favorites_count',
+        'shopping_cart_count',
+    )
     list_filter = ('author', 'name', 'recipe_ingredients')
     search_fields = ('name', 'author__username')
     inlines = [RecipeIngredientInline]
 
     fieldsets = (('', {'fields': ('name', 'author', 'image', 'text', 'cooking_time')}),)
 
-    @admin.display(description='Добавлено в избранное')
-    def favorites_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
-
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
@@ -53,3 +57,9 @@ class FavoriteAdmin(admin.ModelAdmin):
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
+
+
+@admin.register(ShortLink)
+class ShortLinkAdmin(admin.ModelAdmin):
+    list_display = ('id', 'code', 'recipe', 'hits')
+    search_fields = ('code', 'recipe__name')
@@ -0,0 +1,41 @@
+from bisect import bisect_left
+
+from recipes.indexes import BackgroundIndex
+from recipes.models import Ingredient
+from recipes.utils import bump_cache_version, get_cache_versions
+
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+
+
+def get_ingredient_index_version():
+    (version,) = get_cache_versions(INGREDIENT_INDEX_VERSION_KEY)
+    return version
+
+
+def invalidate_ingredient_index():
+    bump_cache_version(INGREDIENT_INDEX_VERSION_KEY)
+
+
+class IngredientPrefixIndex(BackgroundIndex):
+    def load(self):
+        ingredients = sorted(
+            Ingredient.objects.order_by().values('id', 'name', 'measurement_unit'),
+            key=lambda ingredient: (ingredient['name'].casefold(), ingredient['name']),
+        )
+        return [
+            ingredient['name'].casefold() for ingredient in ingredients
+        ], ingredients
+
+    def get_version(self):
+        return get_ingredient_index_version()
+
+    def search(self, prefix):
+        keys, ingredients = self.get_state(wait=True)
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', lo=start)
+        return ingredients[start:end]
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,144 @@
+import csv
+import json
+import re
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from constants import CATALOG_READ_CHUNK_SIZE
+from recipes.autocomplete import invalidate_ingredient_index
+from recipes.feed import fan_out_recipes
+from recipes.matching import invalidate_recipe_ingredient_index
+from recipes.models import FeedItem, Ingredient, Recipe, RecipeIngredient
+from recipes.search import update_search_index
+from recipes.utils import RECIPE_LIST_VERSION_KEY, bump_cache_version, count_by
+
+
+User = get_user_model()
+
+JSON_SEPARATORS = re.compile(r'[\s,\[]*')
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        if position < len(buffer):
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        elif eof:
+            return
+        chunk = file.read(CATALOG_READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        if 'ingredients' in row:
+            row['ingredients'] = json.loads(row['ingredients'])
+        yield row
+
+
+CATALOG_READERS = {'json': read_json, 'csv': read_csv}
+
+
+def import_ingredients(rows):
+    ingredients = {}
+    for row in rows:
+        ingredients[row['name']] = Ingredient(
+            name=row['name'], measurement_unit=row['measurement_unit']
+        )
+    Ingredient.objects.bulk_create(
+        ingredients.values(),
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['measurement_unit'],
+    )
+
+
+def import_recipes(rows, ingredient_ids):
+    recipes = {}
+    recipe_ingredients = {}
+    updated_at = timezone.now()
+    for row in rows:
+        recipe_id = int(row['id'])
+        recipes[recipe_id] = Recipe(
+            pk=recipe_id,
+            author_id=int(row['author']),
+            name=row['name'],
+            text=row['text'],
+            cooking_time=int(row['cooking_time']),
+            image=row.get('image', ''),
+            updated_at=updated_at,
+        )
+        for item in row['ingredients']:
+            ingredient_id = item.get('id') or ingredient_ids[item['name']]
+            recipe_ingredients[recipe_id, int(ingredient_id)] = RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=int(ingredient_id),
+                amount=int(item['amount']),
+            )
+    authors = {recipe.author_id for recipe in recipes.values()}
+    authors.update(
+        Recipe.objects.filter(pk__in=recipes).values_list('author_id', flat=True)
+    )
+    Recipe.objects.bulk_create(
+        recipes.values(),
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=[
+            'author',
+            'name',
+            'text',
+            'cooking_time',
+            'image',
+            'updated_at',
+        ],
+    )
+    RecipeIngredient.objects.filter(recipe_id__in=recipes).delete()
+    RecipeIngredient.objects.bulk_create(recipe_ingredients.values())
+    update_search_index(Recipe.objects.filter(pk__in=recipes))
+    FeedItem.objects.filter(recipe_id__in=recipes).delete()
+    fan_out_recipes((recipe.pk, recipe.author_id) for recipe in recipes.values())
+    User.objects.filter(pk__in=authors).update(
+        recipes_count=count_by(Recipe.objects, 'author')
+    )
+
+
+def import_catalog(kind, rows, batch_size, progress=None):
+    ingredient_ids = {}
+    if kind == 'recipes':
+        ingredient_ids = dict(Ingredient.objects.values_list('name', 'id'))
+    rows = iter(rows)
+    imported = 0
+    while batch := list(islice(rows, batch_size)):
+        with transaction.atomic():
+            if kind == 'ingredients':
+                import_ingredients(batch)
+            else:
+                import_recipes(batch, ingredient_ids)
+        imported += len(batch)
+        if progress is not None:
+            progress(imported)
+    if kind == 'ingredients':
+        invalidate_ingredient_index()
+    else:
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Recipe]):
+                cursor.execute(sql)
+        invalidate_recipe_ingredient_index()
+    bump_cache_version(RECIPE_LIST_VERSION_KEY)
+    return imported
@@ -0,0 +1,101 @@
+import heapq
+from collections import defaultdict
+from functools import partial
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from constants import FEED_BATCH_SIZE, FEED_FANOUT_MAX_SUBSCRIBERS
+from recipes.models import FeedItem, Recipe
+from users.models import Subscription
+
+
+User = get_user_model()
+
+
+def create_feed_items(items):
+    items = iter(items)
+    while batch := list(islice(items, FEED_BATCH_SIZE)):
+        FeedItem.objects.bulk_create(
+            [
+                FeedItem(user_id=user_id, author_id=author_id, recipe_id=recipe_id)
+                for user_id, author_id, recipe_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def fan_out_recipes(recipes):
+    recipe_ids = defaultdict(list)
+    for recipe_id, author_id in recipes:
+        recipe_ids[author_id].append(recipe_id)
+    subscribers = (
+        Subscription.objects.filter(
+            author_id__in=recipe_ids,
+            author__subscribers_count__lte=FEED_FANOUT_MAX_SUBSCRIBERS,
+        )
+        .order_by()
+        .values_list('user_id', 'author_id')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    create_feed_items(
+        (user_id, author_id, recipe_id)
+        for user_id, author_id in subscribers
+        for recipe_id in recipe_ids[author_id]
+    )
+
+
+def fan_out_recipe(recipe_id, author_id):
+    fan_out_recipes([(recipe_id, author_id)])
+
+
+def backfill_feed(subscriptions):
+    items = (
+        subscriptions.filter(
+            author__subscribers_count__lte=FEED_FANOUT_MAX_SUBSCRIBERS,
+            author__recipes__isnull=False,
+        )
+        .order_by()
+        .values_list('user_id', 'author_id', 'author__recipes')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    create_feed_items(items)
+
+
+def remove_from_feed(user_id, author_id):
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def backfill_author_feeds(author_id):
+    if User.objects.filter(
+        pk=author_id, subscribers_count=FEED_FANOUT_MAX_SUBSCRIBERS
+    ).exists():
+        transaction.on_commit(
+            partial(backfill_feed, Subscription.objects.filter(author_id=author_id))
+        )
+
+
+def get_feed_ids(user, cursor, limit):
+    offset, reverse, position = cursor or (0, False, None)
+    lookup, prefix = ('gt', '') if reverse else ('lt', '-')
+    feed_items = FeedItem.objects.filter(user=user)
+    recipes = Recipe.objects.filter(
+        author__in=Subscription.objects.filter(
+            user=user, author__subscribers_count__gt=FEED_FANOUT_MAX_SUBSCRIBERS
+        ).values('author_id')
+    )
+    if position is not None:
+        feed_items = feed_items.filter(**{f'recipe_id__{lookup}': position})
+        recipes = recipes.filter(**{f'pk__{lookup}': position})
+    limit += offset
+    feed_ids = feed_items.order_by(f'{prefix}recipe_id').values_list(
+        'recipe_id', flat=True
+    )
+    author_ids = recipes.order_by(f'{prefix}id').values_list('pk', flat=True)
+    recipe_ids = heapq.merge(feed_ids[:limit], author_ids[:limit], reverse=not reverse)
+    return [recipe_id for recipe_id, _ in islice(groupby(recipe_ids), limit)]
+
+
+def get_feed(queryset, user, cursor, limit):
+    return queryset.filter(pk__in=get_feed_ids(user, cursor, limit))
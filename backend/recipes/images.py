@@ -0,0 +1,129 @@
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from constants import (
+    AVATAR_IMAGE_VARIANTS,
+    IMAGE_VARIANT_QUALITY,
+    RECIPE_IMAGE_VARIANTS,
+)
+from recipes.utils import RECIPE_LIST_VERSION_KEY, bump_cache_version
+
+
+IMAGE_FIELDS = {
+    'recipes.Recipe': ('image', 'image_variants', RECIPE_IMAGE_VARIANTS),
+    'users.CustomUser': ('avatar', 'avatar_variants', AVATAR_IMAGE_VARIANTS),
+}
+IMAGE_FORMATS = (('webp', 'WEBP'), ('jpeg', 'JPEG'))
+
+image_variants_updated = Signal()
+
+logger = logging.getLogger(__name__)
+
+
+class ImmediateQueue:
+    def enqueue(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolQueue:
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='image-pipeline'
+        )
+
+    def enqueue(self, func, *args):
+        self.executor.submit(self.run, func, *args)
+
+    def run(self, func, *args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Ошибка в очереди обработки изображений')
+        finally:
+            connection.close()
+
+
+_queue = None
+
+
+def get_image_queue():
+    global _queue
+    if _queue is None:
+        queue_class = import_string(settings.IMAGE_PIPELINE['QUEUE'])
+        if queue_class is ThreadPoolQueue:
+            _queue = queue_class(settings.IMAGE_PIPELINE['WORKERS'])
+        else:
+            _queue = queue_class()
+    return _queue
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail(size)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    variant.save(buffer, image_format, quality=IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_image_variants(label, pk):
+    field, variants_field, sizes = IMAGE_FIELDS[label]
+    model = apps.get_model(label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    image_file = getattr(instance, field)
+    variants = {}
+    if image_file:
+        directory, filename = posixpath.split(image_file.name)
+        stem = posixpath.splitext(filename)[0]
+        try:
+            with image_file.open('rb'), Image.open(image_file) as image:
+                image = ImageOps.exif_transpose(image)
+                for name, size in sizes.items():
+                    variants[name] = {
+                        extension: default_storage.save(
+                            f'{directory}/variants/{stem}_{name}.{extension}',
+                            ContentFile(render_variant(image, size, image_format)),
+                        )
+                        for extension, image_format in IMAGE_FORMATS
+                    }
+        except OSError:
+            logger.exception('Не удалось обработать %s', image_file.name)
+            return
+    queryset = model.objects.filter(pk=pk)
+    if image_file:
+        queryset = queryset.filter(**{field: image_file.name})
+    queryset.update(
+        **{
+            variants_field: {'source': image_file.name or None, 'variants': variants},
+            'updated_at': timezone.now(),
+        }
+    )
+    image_variants_updated.send(sender=model, pk=pk)
+    bump_cache_version(RECIPE_LIST_VERSION_KEY)
+
+
+def schedule_image_variants(instance):
+    label = instance._meta.label
+    field, variants_field, _ = IMAGE_FIELDS[label]
+    source = getattr(instance, field).name or None
+    if source == getattr(instance, variants_field).get('source'):
+        return
+    transaction.on_commit(
+        partial(get_image_queue().enqueue, generate_image_variants, label, instance.pk)
+    )
@@ -0,0 +1,62 @@
+import threading
+
+from django.db import connection
+
+
+class BackgroundIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = None
+        self.version = None
+        self.building = False
+
+    def load(self):
+        raise NotImplementedError
+
+    def get_version(self):
+        raise NotImplementedError
+
+    def build(self, version):
+        state = self.load()
+        with self.lock:
+            self.state = state
+            self.version = version
+            self.building = False
+        return state
+
+    def build_in_background(self, version):
+        with self.lock:
+            if self.building:
+                return
+            self.building = True
+        threading.Thread(target=self.safe_build, args=(version,), daemon=True).start()
+
+    def safe_build(self, version):
+        try:
+            self.build(version)
+        finally:
+            with self.lock:
+                self.building = False
+            connection.close()
+
+    def update(self, state, version, new_version):
+        return None
+
+    def get_state(self, wait=False):
+        version = self.get_version()
+        with self.lock:
+            if self.version == version:
+                return self.state
+            state, current_version = self.state, self.version
+        if state is not None:
+            state = self.update(state, current_version, version)
+            if state is not None:
+                with self.lock:
+                    if self.version == current_version:
+                        self.state = state
+                        self.version = version
+                return state
+        if wait:
+            return self.build(version)
+        self.build_in_background(version)
+        return None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import backfill_feed
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок рецептами уже существующих подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, help='Заполнить ленту только этого пользователя'
+        )
+
+    def handle(self, *args, **options):
+        subscriptions = Subscription.objects.all()
+        if options['user'] is not None:
+            subscriptions = subscriptions.filter(user_id=options['user'])
+        with transaction.atomic():
+            backfill_feed(subscriptions)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {subscriptions.count()}')
+        )
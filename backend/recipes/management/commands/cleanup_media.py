@@ -0,0 +1,62 @@
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.images import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Не трогать файлы моложе указанного числа секунд',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, которые будут удалены',
+        )
+
+    def get_referenced_files(self):
+        referenced = set()
+        for label, (field, variants_field, _) in IMAGE_FIELDS.items():
+            rows = (
+                apps.get_model(label)
+                .objects.exclude(**{field: ''})
+                .values_list(field, variants_field)
+                .iterator()
+            )
+            for name, variants in rows:
+                referenced.add(name)
+                for formats in variants.get('variants', {}).values():
+                    referenced.update(formats.values())
+        return {os.path.normpath(name) for name in referenced}
+
+    def handle(self, *args, **options):
+        referenced = self.get_referenced_files()
+        deadline = time.time() - options['min_age']
+        removed = freed = 0
+        for directory, _, filenames in os.walk(settings.MEDIA_ROOT):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, settings.MEDIA_ROOT)
+                stat = os.stat(path)
+                if name in referenced or stat.st_mtime > deadline:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    os.remove(path)
+                removed += 1
+                freed += stat.st_size
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} файлов: {removed}, байт: {freed}')
+        )
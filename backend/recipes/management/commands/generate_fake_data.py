@@ -0,0 +1,193 @@
+import io
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from constants import CATALOG_BATCH_SIZE
+from recipes.matching import invalidate_recipe_ingredient_index
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from recipes.utils import RECIPE_LIST_VERSION_KEY, bump_cache_version
+from users.models import Subscription
+
+
+User = get_user_model()
+
+FAKE_PASSWORD = 'fakepassword'
+
+
+class ZipfSampler:
+    def __init__(self, population, exponent, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank**exponent for rank in range(1, len(self.population) + 1)
+            )
+        )
+        self.rng = rng
+
+    def sample(self):
+        return self.rng.choices(self.population, cum_weights=self.cum_weights)[0]
+
+    def sample_unique(self, count):
+        count = min(count, len(self.population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.sample())
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей, рецепты, избранное, корзины и подписки '
+        'с распределением популярности по Ципфу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--shopping-carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument(
+            '--zipf-exponent',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности',
+        )
+        parser.add_argument('--batch-size', type=int, default=CATALOG_BATCH_SIZE)
+        parser.add_argument('--seed', type=int)
+
+    def bulk_create(self, model, objects, **kwargs):
+        objects = iter(objects)
+        created = []
+        started = time.monotonic()
+        while batch := list(islice(objects, self.batch_size)):
+            with transaction.atomic():
+                created.extend(
+                    instance.pk
+                    for instance in model.objects.bulk_create(batch, **kwargs)
+                )
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {len(created)} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+        return created
+
+    def generate_pairs(self, count, users, targets, exclude_self=False):
+        pairs = set()
+        attempts = 0
+        while len(pairs) < count and attempts < count * 10:
+            attempts += 1
+            user = self.rng.choice(users)
+            target = targets.sample()
+            if not exclude_self or user != target:
+                pairs.add((user, target))
+        return pairs
+
+    def create_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (480, 480), 'orange').save(buffer, 'JPEG')
+        return default_storage.save(
+            'recipes/images/fake.jpeg', ContentFile(buffer.getvalue())
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        exponent = options['zipf_exponent']
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов, сначала выполните import_catalog ingredients'
+            )
+        prefix = f'fake{time.time_ns()}'
+        password = make_password(FAKE_PASSWORD)
+        user_ids = self.bulk_create(
+            User,
+            (
+                User(
+                    username=f'{prefix}_{number}',
+                    email=f'{prefix}_{number}@example.com',
+                    first_name='Тест',
+                    last_name=f'Пользователь {number}',
+                    password=password,
+                )
+                for number in range(options['users'])
+            ),
+        )
+        authors = ZipfSampler(user_ids, exponent, self.rng)
+        image = self.create_image()
+        recipe_ids = self.bulk_create(
+            Recipe,
+            (
+                Recipe(
+                    author_id=authors.sample(),
+                    name=f'Тестовый рецепт {number}',
+                    text='Описание тестового рецепта. ' * 10,
+                    cooking_time=self.rng.randint(5, 180),
+                    image=image,
+                )
+                for number in range(options['recipes'])
+            ),
+        )
+        ingredients = ZipfSampler(ingredient_ids, exponent, self.rng)
+        self.bulk_create(
+            RecipeIngredient,
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in ingredients.sample_unique(
+                    options['ingredients_per_recipe']
+                )
+            ),
+        )
+        popular_recipes = ZipfSampler(recipe_ids, exponent, self.rng)
+        for model, count in (
+            (Favorite, options['favorites']),
+            (ShoppingCart, options['shopping_carts']),
+        ):
+            self.bulk_create(
+                model,
+                (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in self.generate_pairs(
+                        count, user_ids, popular_recipes
+                    )
+                ),
+                ignore_conflicts=True,
+            )
+        self.bulk_create(
+            Subscription,
+            (
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id, author_id in self.generate_pairs(
+                    options['subscriptions'], user_ids, authors, exclude_self=True
+                )
+            ),
+            ignore_conflicts=True,
+        )
+        call_command('rebuild_counters', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('backfill_feed', stdout=self.stdout)
+        invalidate_recipe_ingredient_index()
+        bump_cache_version(RECIPE_LIST_VERSION_KEY)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Готово, пароль тестовых пользователей: {FAKE_PASSWORD}'
+            )
+        )
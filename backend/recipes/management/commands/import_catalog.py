@@ -0,0 +1,57 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from constants import CATALOG_BATCH_SIZE
+from recipes.catalog import CATALOG_READERS, import_catalog
+
+
+class Command(BaseCommand):
+    help = 'Импортирует ингредиенты или рецепты из JSON или CSV пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=('ingredients', 'recipes'))
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format',
+            choices=CATALOG_READERS,
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument('--batch-size', type=int, default=CATALOG_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in CATALOG_READERS:
+            raise CommandError(f'Неизвестный формат файла: {path.name}')
+        started = last_report = time.monotonic()
+
+        def progress(imported):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 1:
+                last_report = now
+                self.stdout.write(
+                    f'Импортировано: {imported}, '
+                    f'{imported / (now - started):.0f} записей/с'
+                )
+
+        try:
+            with path.open(encoding='utf-8', newline='') as file:
+                imported = import_catalog(
+                    options['kind'],
+                    CATALOG_READERS[file_format](file),
+                    options['batch_size'],
+                    progress,
+                )
+        except (OSError, KeyError, ValueError, IntegrityError) as error:
+            raise CommandError(f'Ошибка импорта: {error!r}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Импортировано: {imported} за {elapsed:.1f} с, '
+                f'{imported / max(elapsed, 1e-9):.0f} записей/с'
+            )
+        )
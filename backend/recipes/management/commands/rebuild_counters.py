@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.utils import count_by
+from users.models import Subscription
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes = Recipe.objects.update(
+                favorites_count=count_by(Favorite.objects, 'recipe'),
+                shopping_cart_count=count_by(ShoppingCart.objects, 'recipe'),
+            )
+            users = User.objects.update(
+                recipes_count=count_by(Recipe.objects, 'author'),
+                subscribers_count=count_by(Subscription.objects, 'author'),
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано рецептов: {recipes}, пользователей: {users}'
+            )
+        )
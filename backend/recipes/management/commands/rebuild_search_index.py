@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс рецептов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            update_search_index(Recipe.objects.all())
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
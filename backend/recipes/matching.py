@@ -0,0 +1,182 @@
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Value, When
+
+from constants import (
+    INGREDIENT_MATCH_LIMIT,
+    RECIPE_INGREDIENT_INDEX_CHANGE_TIMEOUT,
+    RECIPE_INGREDIENT_INDEX_MAX_CHANGES,
+)
+from recipes.indexes import BackgroundIndex
+from recipes.models import RecipeIngredient
+from recipes.utils import bump_cache_version, count_by, get_cache_versions
+
+
+RECIPE_INGREDIENT_INDEX_VERSION_KEY = 'recipe_ingredient_index_version'
+INGREDIENT_MATCH_MODES = {
+    'all': lambda count: count,
+    'any': lambda count: 1,
+    'most': lambda count: count // 2 + 1,
+}
+
+
+def get_change_counter_key(epoch):
+    return f'recipe_ingredient_index_changes:{epoch}'
+
+
+def get_change_key(epoch, number):
+    return f'recipe_ingredient_index_change:{epoch}:{number}'
+
+
+def get_recipe_ingredient_index_version():
+    (epoch,) = get_cache_versions(RECIPE_INGREDIENT_INDEX_VERSION_KEY)
+    number = cache.get(get_change_counter_key(epoch))
+    if number is None:
+        epoch = uuid.uuid4().hex
+        cache.set(get_change_counter_key(epoch), 0, timeout=None)
+        cache.set(RECIPE_INGREDIENT_INDEX_VERSION_KEY, epoch, timeout=None)
+        number = 0
+    return epoch, number
+
+
+def invalidate_recipe_ingredient_index():
+    bump_cache_version(RECIPE_INGREDIENT_INDEX_VERSION_KEY)
+
+
+def record_recipe_ingredient_changes(recipe_ids):
+    epoch, _ = get_recipe_ingredient_index_version()
+    try:
+        number = cache.incr(get_change_counter_key(epoch))
+    except ValueError:
+        invalidate_recipe_ingredient_index()
+        return
+    cache.set(
+        get_change_key(epoch, number),
+        list(recipe_ids),
+        RECIPE_INGREDIENT_INDEX_CHANGE_TIMEOUT,
+    )
+
+
+def update_posting(posting, removed, added):
+    return array('q', sorted(set(posting).difference(removed).union(added)))
+
+
+def select_matches(coverage, min_coverage):
+    return [
+        (recipe_id, count)
+        for recipe_id, count in coverage.items()
+        if count >= min_coverage
+    ]
+
+
+class RecipeIngredientIndex(BackgroundIndex):
+    def load(self):
+        postings = defaultdict(list)
+        recipes = defaultdict(list)
+        rows = RecipeIngredient.objects.order_by().values_list(
+            'ingredient_id', 'recipe_id'
+        )
+        for ingredient_id, recipe_id in rows.iterator():
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        return {
+            ingredient_id: array('q', sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }, {recipe_id: tuple(ingredients) for recipe_id, ingredients in recipes.items()}
+
+    def get_version(self):
+        return get_recipe_ingredient_index_version()
+
+    def update(self, state, version, new_version):
+        if version is None or version[0] != new_version[0]:
+            return None
+        numbers = range(version[1] + 1, new_version[1] + 1)
+        if not 0 < len(numbers) <= RECIPE_INGREDIENT_INDEX_MAX_CHANGES:
+            return None
+        keys = [get_change_key(new_version[0], number) for number in numbers]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        recipe_ids = set(chain.from_iterable(changes.values()))
+        current = defaultdict(set)
+        rows = (
+            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by()
+            .values_list('recipe_id', 'ingredient_id')
+        )
+        for recipe_id, ingredient_id in rows:
+            current[recipe_id].add(ingredient_id)
+        postings, recipes = dict(state[0]), dict(state[1])
+        removed, added = defaultdict(set), defaultdict(set)
+        for recipe_id in recipe_ids:
+            previous = set(recipes.pop(recipe_id, ()))
+            ingredients = current.get(recipe_id, set())
+            if ingredients:
+                recipes[recipe_id] = tuple(ingredients)
+            for ingredient_id in previous - ingredients:
+                removed[ingredient_id].add(recipe_id)
+            for ingredient_id in ingredients - previous:
+                added[ingredient_id].add(recipe_id)
+        for ingredient_id in removed.keys() | added.keys():
+            posting = update_posting(
+                postings.get(ingredient_id, ()),
+                removed[ingredient_id],
+                added[ingredient_id],
+            )
+            if posting:
+                postings[ingredient_id] = posting
+            else:
+                postings.pop(ingredient_id, None)
+        return postings, recipes
+
+    def match(self, ingredient_ids, min_coverage):
+        state = self.get_state()
+        if state is None:
+            return None
+        postings, _ = state
+        lists = sorted(
+            (postings.get(ingredient_id, ()) for ingredient_id in ingredient_ids),
+            key=len,
+        )
+        if min_coverage < len(lists):
+            return select_matches(Counter(chain.from_iterable(lists)), min_coverage)
+        recipe_ids = set(lists[0])
+        for recipe_list in lists[1:]:
+            if not recipe_ids:
+                break
+            recipe_ids.intersection_update(recipe_list)
+        return select_matches(dict.fromkeys(recipe_ids, len(lists)), min_coverage)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
+
+
+def match_recipes(queryset, ingredient_ids, match):
+    min_coverage = INGREDIENT_MATCH_MODES[match](len(ingredient_ids))
+    matches = recipe_ingredient_index.match(ingredient_ids, min_coverage)
+    if matches is None or len(matches) > INGREDIENT_MATCH_LIMIT:
+        recipe_ingredients = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        )
+        return (
+            queryset.filter(pk__in=recipe_ingredients.values('recipe'))
+            .annotate(ingredient_coverage=count_by(recipe_ingredients, 'recipe'))
+            .filter(ingredient_coverage__gte=min_coverage)
+        )
+    by_coverage = {}
+    for recipe_id, coverage in matches:
+        by_coverage.setdefault(coverage, []).append(recipe_id)
+    return queryset.filter(pk__in=[recipe_id for recipe_id, _ in matches]).annotate(
+        ingredient_coverage=Case(
+            *(
+                When(pk__in=recipe_ids, then=Value(coverage))
+                for coverage, recipe_ids in by_coverage.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:43
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Существующие записи не должны попадать в окна популярности за сутки и неделю.
+FAVORITES_CREATED_BEFORE = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0003_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=FAVORITES_CREATED_BEFORE,
+                verbose_name='Добавлено',
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-favorites_count', '-id'], name='recipe_popular_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'
+            ),
+        ),
+    ]
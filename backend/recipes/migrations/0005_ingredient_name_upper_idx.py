@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+INDEX_NAME = 'ingredient_name_upper_idx'
+
+
+def create_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {INDEX_NAME} ON recipes_ingredient '
+            '(UPPER(name) varchar_pattern_ops)'
+        )
+
+
+def drop_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0004_popularity'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
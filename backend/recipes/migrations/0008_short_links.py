@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortLink',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'code',
+                    models.CharField(max_length=6, unique=True, verbose_name='Код'),
+                ),
+                (
+                    'hits',
+                    models.PositiveBigIntegerField(
+                        default=0, editable=False, verbose_name='Переходы'
+                    ),
+                ),
+                (
+                    'recipe',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='short_link',
+                        to='recipes.recipe',
+                        verbose_name='Рецепт',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Короткая ссылка',
+                'verbose_name_plural': 'Короткие ссылки',
+                'ordering': ('recipe',),
+            },
+        ),
+    ]
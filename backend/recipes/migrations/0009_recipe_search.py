@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+FORWARD_SQL = {
+    'postgresql': (
+        'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+        'USING gin (search_vector)',
+        'UPDATE recipes_recipe r SET search_vector = '
+        "setweight(to_tsvector('russian', COALESCE(r.name, '')), 'A') || "
+        "setweight(to_tsvector('russian', COALESCE(("
+        "SELECT string_agg(i.name, ' ') FROM recipes_recipeingredient ri "
+        'JOIN recipes_ingredient i ON i.id = ri.ingredient_id '
+        "WHERE ri.recipe_id = r.id), '')), 'B') || "
+        "setweight(to_tsvector('russian', COALESCE(r.text, '')), 'C')",
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE recipes_recipe_search USING fts5('
+        'name, ingredients, text, tokenize="unicode61")',
+        'INSERT INTO recipes_recipe_search (rowid, name, ingredients, text) '
+        "SELECT r.id, r.name, COALESCE(GROUP_CONCAT(i.name, ' '), ''), r.text "
+        'FROM recipes_recipe r '
+        'LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id '
+        'LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id '
+        'GROUP BY r.id',
+    ),
+}
+REVERSE_SQL = {
+    'postgresql': ('DROP INDEX IF EXISTS recipe_search_vector_idx',),
+    'sqlite': ('DROP TABLE IF EXISTS recipes_recipe_search',),
+}
+
+
+def build_search_index(apps, schema_editor):
+    for statement in FORWARD_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    for statement in REVERSE_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0008_short_links'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name='Поисковый индекс'
+            ),
+        ),
+        migrations.RunPython(build_search_index, remove_search_index),
+    ]
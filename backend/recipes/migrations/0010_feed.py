@@ -0,0 +1,100 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:00
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+FEED_FANOUT_MAX_SUBSCRIBERS = 1000
+FEED_BATCH_SIZE = 1000
+
+
+def backfill_feed(apps, schema_editor):
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Subscription = apps.get_model('users', 'Subscription')
+    rows = (
+        Subscription.objects.filter(
+            author__subscribers_count__lte=FEED_FANOUT_MAX_SUBSCRIBERS,
+            author__recipes__isnull=False,
+        )
+        .order_by()
+        .values_list('user_id', 'author_id', 'author__recipes')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    while batch := list(islice(rows, FEED_BATCH_SIZE)):
+        FeedItem.objects.bulk_create(
+            [
+                FeedItem(user_id=user_id, author_id=author_id, recipe_id=recipe_id)
+                for user_id, author_id, recipe_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0009_recipe_search'),
+        ('users', '0002_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'author',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Автор',
+                    ),
+                ),
+                (
+                    'recipe',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='feed_items',
+                        to='recipes.recipe',
+                        verbose_name='Рецепт',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='feed_items',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Пользователь',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'indexes': [
+                    models.Index(
+                        fields=['user', 'author'], name='feed_item_user_author_idx'
+                    )
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('user', 'recipe'), name='feed_item_user_recipe'
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_feed, migrations.RunPython.noop),
+    ]
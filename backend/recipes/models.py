@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
@@ -8,7 +9,9 @@ from constants import (
     MAX_RECIPE_NAME_LENGTH,
     MIN_AMOUNT_LENGTH,
     MIN_COOKING_TIME_LENGTH,
+    SHORT_LINK_CODE_LENGTH,
 )
+from users.models import DenormalizedFieldsMixin
 
 
 User = get_user_model()
@@ -71,11 +74,19 @@ class RecipeIngredient(models.Model):
         return f'{self.recipe}({self.recipe.pk}) : {self.ingredient}'
 
 
-class Recipe(models.Model):
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes', verbose_name='Автор'
     )
     image = models.ImageField(verbose_name='Фото', upload_to='recipes/images/')
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото', default=dict, editable=False
+    )
     name = models.CharField(verbose_name='Название', max_length=MAX_RECIPE_NAME_LENGTH)
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveIntegerField(
@@ -84,11 +95,37 @@ class Recipe(models.Model):
             MinValueValidator(MIN_COOKING_TIME_LENGTH),
         ],
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в избранное', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлено в корзину', default=0, editable=False
+    )
+    updated_at = models.DateTimeField(verbose_name='Изменено', auto_now=True)
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый индекс', null=True, editable=False
+    )
+
+    objects = RecipeManager()
+
+    denormalized_fields = (
+        'image_variants',
+        'favorites_count',
+        'shopping_cart_count',
+        'search_vector',
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=['-favorites_count', '-id'], name='recipe_popular_idx'),
+            models.Index(
+                fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'
+            ),
+            models.Index(fields=['author', '-id'], name='recipe_author_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author}: {self.name}'
@@ -107,6 +144,9 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -146,3 +186,59 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user}: {self.recipe}({self.recipe.pk})   '
+
+
+class ShortLink(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link',
+        verbose_name='Рецепт',
+    )
+    code = models.CharField(
+        verbose_name='Код', max_length=SHORT_LINK_CODE_LENGTH, unique=True
+    )
+    hits = models.PositiveBigIntegerField(
+        verbose_name='Переходы', default=0, editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+        ordering = ('recipe',)
+
+    def __str__(self):
+        return f'{self.code} -> {self.recipe}'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+', verbose_name='Автор'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='feed_item_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', 'author'], name='feed_item_user_author_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}({self.recipe_id})'
@@ -0,0 +1,73 @@
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.utils import (
+    RECIPE_POPULARITY_VERSION_KEY,
+    bump_cache_version,
+    get_user_cache_version_key,
+)
+
+
+User = get_user_model()
+
+RELATION_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+batched_relations = ContextVar('batched_relations', default=False)
+
+
+def lock_user(user):
+    User.objects.select_for_update().filter(pk=user.pk).exists()
+
+
+def change_recipe_counters(model, recipe_ids, delta):
+    field = RELATION_COUNTERS[model]
+    Recipe.objects.filter(pk__in=recipe_ids).update(**{field: F(field) + delta})
+
+
+def relations_changed(model, user):
+    if model is Favorite:
+        bump_cache_version(RECIPE_POPULARITY_VERSION_KEY)
+    bump_cache_version(get_user_cache_version_key(user.pk))
+
+
+def add_recipe_relations(model, user, recipe_ids):
+    with transaction.atomic():
+        lock_user(user)
+        existing = set(
+            model.objects.filter(user=user, recipe_id__in=recipe_ids).values_list(
+                'recipe_id', flat=True
+            )
+        )
+        created = [recipe_id for recipe_id in recipe_ids if recipe_id not in existing]
+        if created:
+            model.objects.bulk_create(
+                [model(user=user, recipe_id=recipe_id) for recipe_id in created],
+                ignore_conflicts=True,
+            )
+            change_recipe_counters(model, created, 1)
+    if created:
+        transaction.on_commit(lambda: relations_changed(model, user))
+    return existing, set(created)
+
+
+def remove_recipe_relations(model, user, recipe_ids):
+    relations = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+    with transaction.atomic():
+        lock_user(user)
+        deleted = set(relations.values_list('recipe_id', flat=True))
+        if deleted:
+            token = batched_relations.set(True)
+            try:
+                relations.delete()
+            finally:
+                batched_relations.reset(token)
+            change_recipe_counters(model, deleted, -1)
+    if deleted:
+        transaction.on_commit(lambda: relations_changed(model, user))
+    return deleted
@@ -0,0 +1,98 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+
+SEARCH_CONFIG = 'russian'
+SEARCH_TABLE = 'recipes_recipe_search'
+SEARCH_WEIGHTS = {'name': 'A', 'ingredients': 'B', 'text': 'C'}
+FTS5_WEIGHTS = (10.0, 4.0, 1.0)
+
+
+def get_vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def update_search_index(recipes):
+    vendor = get_vendor(recipes)
+    if vendor == 'postgresql':
+        from django.contrib.postgres.aggregates import StringAgg
+
+        recipe_ingredients = recipes.model._meta.get_field(
+            'recipe_ingredients'
+        ).related_model
+        ingredient_names = (
+            recipe_ingredients.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(names=StringAgg('ingredient__name', ' '))
+            .values('names')
+        )
+        recipes.update(
+            search_vector=SearchVector(
+                'name', weight=SEARCH_WEIGHTS['name'], config=SEARCH_CONFIG
+            )
+            + SearchVector(
+                Coalesce(Subquery(ingredient_names), Value('')),
+                weight=SEARCH_WEIGHTS['ingredients'],
+                config=SEARCH_CONFIG,
+            )
+            + SearchVector('text', weight=SEARCH_WEIGHTS['text'], config=SEARCH_CONFIG)
+        )
+    elif vendor == 'sqlite':
+        ids_sql, params = recipes.order_by().values('pk').query.sql_with_params()
+        with connections[recipes.db].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({ids_sql})', params
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_WEIGHTS)}) '
+                "SELECT r.id, r.name, COALESCE(GROUP_CONCAT(i.name, ' '), ''), "
+                'r.text FROM recipes_recipe r '
+                'LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id '
+                'LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id '
+                f'WHERE r.id IN ({ids_sql}) GROUP BY r.id',
+                params,
+            )
+
+
+def remove_from_search_index(recipe_id, using='default'):
+    if connections[using].vendor == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (recipe_id,))
+
+
+def make_fts5_query(value):
+    terms = re.findall(r'\w+', value)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_recipes(queryset, value):
+    vendor = get_vendor(queryset)
+    if vendor == 'postgresql':
+        query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+    if vendor == 'sqlite':
+        query = make_fts5_query(value)
+        if not query:
+            return queryset.none()
+        weights = ', '.join(map(str, FTS5_WEIGHTS))
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+                (query,),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = recipes_recipe.id',
+                (query,),
+            )
+        )
+    return queryset.filter(name__icontains=value)
@@ -0,0 +1,142 @@
+import atexit
+import secrets
+import string
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+
+from constants import (
+    SHORT_LINK_CACHE_SIZE,
+    SHORT_LINK_CODE_LENGTH,
+    SHORT_LINK_HITS_BATCH_SIZE,
+    SHORT_LINK_HITS_FLUSH_INTERVAL,
+)
+from recipes.models import ShortLink
+
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+
+def encode_base62(number, length=SHORT_LINK_CODE_LENGTH):
+    digits = []
+    while number:
+        number, remainder = divmod(number, len(BASE62_ALPHABET))
+        digits.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(digits)).rjust(length, BASE62_ALPHABET[0])
+
+
+def generate_code():
+    return encode_base62(
+        secrets.randbelow(len(BASE62_ALPHABET) ** SHORT_LINK_CODE_LENGTH)
+    )
+
+
+def get_short_link_code(recipe):
+    code = (
+        ShortLink.objects.filter(recipe=recipe).values_list('code', flat=True).first()
+    )
+    while code is None:
+        try:
+            with transaction.atomic():
+                code = ShortLink.objects.create(
+                    recipe=recipe, code=generate_code()
+                ).code
+        except IntegrityError:
+            code = (
+                ShortLink.objects.filter(recipe=recipe)
+                .values_list('code', flat=True)
+                .first()
+            )
+    return code
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            self.items[key] = (value, expires)
+            self.items.move_to_end(key)
+            if len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+class HitCounter:
+    def __init__(self, batch_size, flush_interval):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.pending = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flushed_at = time.monotonic()
+
+    def add(self, code):
+        with self.lock:
+            self.hits[code] += 1
+            self.pending += 1
+            if (
+                self.pending < self.batch_size
+                and time.monotonic() - self.flushed_at < self.flush_interval
+            ):
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+            self.pending = 0
+            self.flushed_at = time.monotonic()
+        if hits:
+            ShortLink.objects.filter(code__in=hits).update(
+                hits=F('hits')
+                + Case(
+                    *(
+                        When(code=code, then=Value(count))
+                        for code, count in hits.items()
+                    )
+                )
+            )
+
+
+short_link_cache = LRUCache(SHORT_LINK_CACHE_SIZE)
+hit_counter = HitCounter(SHORT_LINK_HITS_BATCH_SIZE, SHORT_LINK_HITS_FLUSH_INTERVAL)
+atexit.register(hit_counter.flush)
+
+
+def resolve_short_link(code):
+    recipe_id = short_link_cache.get(code)
+    if recipe_id is None:
+        recipe_id = (
+            ShortLink.objects.filter(code=code)
+            .values_list('recipe_id', flat=True)
+            .first()
+        )
+        if recipe_id is None:
+            return None
+        short_link_cache.set(code, recipe_id)
+    hit_counter.add(code)
+    return recipe_id
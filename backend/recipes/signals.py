@@ -0,0 +1,138 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import invalidate_ingredient_index
+from .feed import fan_out_recipe
+from .images import schedule_image_variants
+from .matching import record_recipe_ingredient_changes
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShortLink,
+)
+from .relations import RELATION_COUNTERS, batched_relations
+from .search import remove_from_search_index, update_search_index
+from .shortlinks import short_link_cache
+from .utils import (
+    RECIPE_LIST_VERSION_KEY,
+    RECIPE_POPULARITY_VERSION_KEY,
+    bump_cache_versions_on_commit,
+    get_user_cache_version_key,
+)
+
+
+User = get_user_model()
+
+
+def change_counters(model, pk, delta, *fields):
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta for field in fields})
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    invalidate_ingredient_index()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(record_recipe_ingredient_changes, [instance.recipe_id])
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_list_changed(sender, **kwargs):
+    bump_cache_versions_on_commit(RECIPE_LIST_VERSION_KEY)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorites_changed(sender, instance, **kwargs):
+    if batched_relations.get():
+        return
+    bump_cache_versions_on_commit(
+        RECIPE_POPULARITY_VERSION_KEY, get_user_cache_version_key(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    if batched_relations.get():
+        return
+    bump_cache_versions_on_commit(get_user_cache_version_key(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counters(User, instance.author_id, 1, 'recipes_count')
+        transaction.on_commit(partial(fan_out_recipe, instance.pk, instance.author_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    schedule_image_variants(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(update_search_index, Recipe.objects.filter(pk=instance.pk))
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, using, **kwargs):
+    remove_from_search_index(instance.pk, using)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(
+            partial(
+                update_search_index,
+                Recipe.objects.filter(recipe_ingredients__ingredient=instance.pk),
+            )
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counters(User, instance.author_id, -1, 'recipes_count')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_relation_created(sender, instance, created, **kwargs):
+    if created:
+        change_counters(Recipe, instance.recipe_id, 1, RELATION_COUNTERS[sender])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_relation_deleted(sender, instance, **kwargs):
+    if batched_relations.get():
+        return
+    change_counters(Recipe, instance.recipe_id, -1, RELATION_COUNTERS[sender])
+
+
+@receiver(post_delete, sender=ShortLink)
+def short_link_deleted(sender, instance, **kwargs):
+    short_link_cache.delete(instance.code)
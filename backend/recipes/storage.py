@@ -0,0 +1,28 @@
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+
+
+def get_content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = posixpath.split(name)
+        name = posixpath.join(
+            directory,
+            get_content_hash(content) + posixpath.splitext(filename)[1].lower(),
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
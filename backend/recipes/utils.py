@@ -1,16 +1,103 @@
 import csv
-import io
+import json
+import uuid
+from datetime import timedelta
 
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
-def get_csv_data(ingredients):
-    stream = io.StringIO()
-    writer = csv.writer(stream)
+
+SHOPPING_LIST_FORMATS = {}
+
+POPULARITY_PERIODS = {
+    '24h': timedelta(days=1),
+    '7d': timedelta(days=7),
+}
+
+
+RECIPE_LIST_VERSION_KEY = 'recipe_list_version'
+RECIPE_POPULARITY_VERSION_KEY = 'recipe_popularity_version'
+
+
+def get_user_cache_version_key(user_id):
+    return f'recipe_list_user_version:{user_id}'
+
+
+def get_cache_versions(*keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_cache_version(key):
+    cache.set(key, uuid.uuid4().hex, timeout=None)
+
+
+def bump_cache_versions_on_commit(*keys):
+    def bump():
+        for key in keys:
+            bump_cache_version(key)
+
+    transaction.on_commit(bump)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_list_format(name, content_type, extension):
+    def decorator(writer):
+        SHOPPING_LIST_FORMATS[name] = {
+            'writer': writer,
+            'content_type': content_type,
+            'extension': extension,
+        }
+        return writer
+
+    return decorator
+
+
+@shopping_list_format('csv', 'text/csv', 'csv')
+def write_csv(ingredients):
+    writer = csv.writer(Echo())
+    for ingredient in ingredients:
+        name = ingredient['name']
+        measurement_unit = ingredient['measurement_unit']
+        yield writer.writerow([f'{name} ({measurement_unit})', ingredient['amount']])
+
+
+@shopping_list_format('txt', 'text/plain; charset=utf-8', 'txt')
+def write_txt(ingredients):
     for ingredient in ingredients:
-        name = ingredient['recipe__recipe_ingredients__ingredient__name']
-        measurement_unit = ingredient[
-            'recipe__recipe_ingredients__ingredient__measurement_unit'
-        ]
-        amount = ingredient['amount']
-        payload = [f'{name} ({measurement_unit})', amount]
-        writer.writerow(payload)
-    return stream.getvalue()
+        name = ingredient['name']
+        measurement_unit = ingredient['measurement_unit']
+        yield f'{name} ({measurement_unit}) — {ingredient["amount"]}\n'
+
+
+@shopping_list_format('json', 'application/json', 'json')
+def write_json(ingredients):
+    separator = '['
+    for ingredient in ingredients:
+        yield separator + json.dumps(ingredient, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def count_by(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
@@ -0,0 +1,10 @@
+from django.http import Http404, HttpResponseRedirect
+
+from recipes.shortlinks import resolve_short_link
+
+
+def short_link_redirect(request, code):
+    recipe_id = resolve_short_link(code)
+    if recipe_id is None:
+        raise Http404
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
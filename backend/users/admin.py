@@ -6,7 +6,14 @@ from .models import CustomUser, Subscription
 
 @admin.register(CustomUser)
 class UserAdmin(DefaultUserAdmin):
-    list_display = ('username', 'email', 'is_active', 'is_staff')
+    list_display = (
+        'username',
+        'email',
+        'is_active',
+        'is_staff',
+        'recipes_count',
+        'subscribers_count',
+    )
     search_fields = ('username', 'email')
 
     fieldsets = (
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_variants',
+            field=models.JSONField(
+                default=dict, editable=False, verbose_name='Уменьшенные копии фото'
+            ),
+        ),
+    ]
@@ -4,7 +4,21 @@ from django.contrib.auth.models import AbstractUser
 from constants import MAX_FIRSTNAME_LENGTH, MAX_LASTNAME_LENGTH, MAX_EMAIL_LENGTH
 
 
-class CustomUser(AbstractUser):
+class DenormalizedFieldsMixin:
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = {*self.denormalized_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class CustomUser(DenormalizedFieldsMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
     first_name = models.CharField(
@@ -27,6 +41,18 @@ class CustomUser(AbstractUser):
         null=True,
         blank=True,
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото', default=dict, editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков', default=0, editable=False
+    )
+    updated_at = models.DateTimeField(verbose_name='Изменено', auto_now=True)
+
+    denormalized_fields = ('avatar_variants', 'recipes_count', 'subscribers_count')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user_tokens
+from recipes.feed import backfill_author_feeds, backfill_feed, remove_from_feed
+from recipes.images import image_variants_updated, schedule_image_variants
+from recipes.signals import change_counters
+from recipes.utils import (
+    RECIPE_LIST_VERSION_KEY,
+    bump_cache_versions_on_commit,
+    get_user_cache_version_key,
+)
+
+from .models import CustomUser, Subscription
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_counters(CustomUser, instance.author_id, 1, 'subscribers_count')
+        transaction.on_commit(
+            partial(backfill_feed, Subscription.objects.filter(pk=instance.pk))
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counters(CustomUser, instance.author_id, -1, 'subscribers_count')
+    remove_from_feed(instance.user_id, instance.author_id)
+    backfill_author_feeds(instance.author_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscriptions_changed(sender, instance, **kwargs):
+    bump_cache_versions_on_commit(get_user_cache_version_key(instance.user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_cache_versions_on_commit(RECIPE_LIST_VERSION_KEY)
+        schedule_image_variants(instance)
+        if not created:
+            invalidate_user_tokens(instance)
+
+
+@receiver(image_variants_updated, sender=CustomUser)
+def avatar_variants_updated(sender, pk, **kwargs):
+    for key in Token.objects.filter(user_id=pk).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)